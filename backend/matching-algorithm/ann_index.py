@@ -0,0 +1,246 @@
+"""
+Approximate Nearest-Neighbour Index for Listing Embeddings
+
+Inverted-file (IVF) index over unit-length embeddings: spherical k-means
+centroids split the vectors into lists, and a query only scores the
+members of the `n_probe` lists whose centroids are closest to it. More
+probes find more of the true nearest neighbours at a higher cost; probing
+every list is an exact search. Until there are enough vectors to train
+on, every query is an exact scan.
+
+Vectors are added and removed per listing id, so the resident store keeps
+the index current across pool rebuilds. New vectors join the list of their
+nearest centroid; the centroids are retrained once the index has grown or
+shrunk well past the size they were trained on.
+"""
+
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Vectors per list needed before training (FAISS warns below this)
+MIN_POINTS_PER_LIST = 39
+# Retrain when the size leaves [trained / factor, trained * factor]
+RETRAIN_FACTOR = 2.0
+# k-means on a sample of this many vectors per list, for a few rounds
+SAMPLE_PER_LIST = 32
+KMEANS_ITERATIONS = 8
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> np.ndarray:
+    """(k x d) unit-length centroids of unit-length `vectors`, by cosine assignment."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        norms = np.linalg.norm(sums, axis=1)
+        # An empty cluster keeps its old centroid
+        filled = norms > 0
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+
+class IVFIndex:
+    """
+    Listing id -> embedding, searchable by cosine similarity. `n_lists` of
+    0 picks sqrt(size) at each training.
+    """
+
+    def __init__(self, n_lists: int = 0, n_probe: int = 32, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.dim: Optional[int] = None
+        self.trained_size = 0
+        # Slot storage; freed slots are reused
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._assign = np.empty(0, dtype=np.int64)
+        self._high = 0
+        self._free: List[int] = []
+        self._slot_of: Dict[int, int] = {}
+        # Inverted lists: centroid -> slots (arrays built lazily)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[set] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, listing_id: int) -> bool:
+        return listing_id in self._slot_of
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    # ── Updates ──
+
+    def add(self, listing_ids: Sequence[int], vectors: Sequence[np.ndarray]) -> int:
+        """
+        Insert or replace vectors; zero, non-finite or wrong-sized vectors
+        are skipped. Returns how many were stored.
+        """
+        rows, ids = [], []
+        for listing_id, vec in zip(listing_ids, vectors):
+            arr = np.asarray(vec, dtype=np.float32)
+            norm = float(np.linalg.norm(arr))
+            if arr.ndim != 1 or not np.isfinite(norm) or norm == 0:
+                continue
+            if self.dim is None:
+                self.dim = arr.shape[0]
+            if arr.shape != (self.dim,):
+                continue
+            rows.append(arr / np.float32(norm))
+            ids.append(listing_id)
+        if not rows:
+            return 0
+
+        self.remove(ids)
+        slots = [self._allocate() for _ in ids]
+        self._vectors[slots] = np.stack(rows)
+        self._ids[slots] = ids
+        for listing_id, slot in zip(ids, slots):
+            self._slot_of[listing_id] = slot
+
+        if self._needs_training():
+            self._train()
+        elif self.trained:
+            self._assign_slots(np.asarray(slots))
+        return len(ids)
+
+    def remove(self, listing_ids: Sequence[int]) -> int:
+        removed = 0
+        for listing_id in listing_ids:
+            slot = self._slot_of.pop(listing_id, None)
+            if slot is None:
+                continue
+            if self.trained:
+                lst = self._assign[slot]
+                self._lists[lst].discard(slot)
+                self._list_arrays[lst] = None
+            self._ids[slot] = -1
+            self._free.append(slot)
+            removed += 1
+        if removed and self.trained and len(self) < self.trained_size / RETRAIN_FACTOR:
+            self._train()
+        return removed
+
+    def clear(self):
+        self.__init__(self.n_lists, self.n_probe, self.seed)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._high == len(self._ids):
+            capacity = max(1024, 2 * len(self._ids))
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            if self._high:
+                vectors[:self._high] = self._vectors[:self._high]
+            self._vectors = vectors
+            self._ids = np.concatenate([self._ids, np.full(capacity - len(self._ids), -1, dtype=np.int64)])
+            self._assign = np.concatenate([self._assign, np.full(capacity - len(self._assign), -1, dtype=np.int64)])
+        self._high += 1
+        return self._high - 1
+
+    # ── Training ──
+
+    def _target_lists(self, size: int) -> int:
+        return self.n_lists if self.n_lists > 0 else max(1, int(math.sqrt(size)))
+
+    def _needs_training(self) -> bool:
+        size = len(self)
+        if self.trained:
+            return size > self.trained_size * RETRAIN_FACTOR
+        return self._target_lists(size) > 1 and size >= MIN_POINTS_PER_LIST * self._target_lists(size)
+
+    def _live_slots(self) -> np.ndarray:
+        return np.flatnonzero(self._ids[:self._high] >= 0)
+
+    def _train(self):
+        live = self._live_slots()
+        k = min(self._target_lists(len(live)), len(live))
+        if k <= 1:
+            self._centroids = None
+            self.trained_size = 0
+            return
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(live), SAMPLE_PER_LIST * k)
+        sample = live if sample_size == len(live) else rng.choice(live, size=sample_size, replace=False)
+        self._centroids = spherical_kmeans(self._vectors[sample], k, seed=self.seed)
+        self._lists = [set() for _ in range(k)]
+        self._list_arrays = [None] * k
+        self._assign_slots(live)
+        self.trained_size = len(live)
+
+    def _assign_slots(self, slots: np.ndarray):
+        # In blocks, so the (slots x lists) score matrix stays small
+        for start in range(0, len(slots), 8192):
+            block = slots[start:start + 8192]
+            assign = np.argmax(self._vectors[block] @ self._centroids.T, axis=1)
+            self._assign[block] = assign
+            for slot, lst in zip(block.tolist(), assign.tolist()):
+                self._lists[lst].add(slot)
+                self._list_arrays[lst] = None
+
+    def _list_slots(self, lst: int) -> np.ndarray:
+        arr = self._list_arrays[lst]
+        if arr is None:
+            arr = np.fromiter(self._lists[lst], dtype=np.int64, count=len(self._lists[lst]))
+            self._list_arrays[lst] = arr
+        return arr
+
+    # ── Search ──
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        n_probe: Optional[int] = None,
+        allowed: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ids and cosine scores of (approximately) the `k` vectors most similar
+        to `query`, best first. `allowed` maps candidate ids to a boolean
+        mask of the ones that may be returned (e.g. those in radius).
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        query = np.asarray(query, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if k <= 0 or not len(self) or query.shape != (self.dim,) or not np.isfinite(norm) or norm == 0:
+            return empty
+        query = query / np.float32(norm)
+
+        if self.trained:
+            centroid_scores = self._centroids @ query
+            probes = min(max(1, n_probe or self.n_probe), len(centroid_scores))
+            nearest = np.argpartition(-centroid_scores, probes - 1)[:probes]
+            slots = np.concatenate([self._list_slots(lst) for lst in nearest.tolist()])
+        else:
+            slots = self._live_slots()
+
+        ids = self._ids[slots]
+        if allowed is not None:
+            keep = allowed(ids)
+            slots, ids = slots[keep], ids[keep]
+        if not len(slots):
+            return empty
+
+        scores = self._vectors[slots] @ query
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top], scores[top]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "entries": len(self),
+            "dim": self.dim,
+            "lists": len(self._lists) if self.trained else 0,
+            "trained_size": self.trained_size,
+            "n_probe": self.n_probe,
+        }
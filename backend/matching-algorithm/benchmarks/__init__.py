@@ -0,0 +1,10 @@
+"""
+Matching Worker Benchmarks
+
+Synthetic workloads (workload.py), an offline OpenAI-compatible embedding
+server (embedding_server.py) and the benchmark runner (run.py). Run from
+backend/matching-algorithm:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --mode semantic --sizes 1000 10000
+"""
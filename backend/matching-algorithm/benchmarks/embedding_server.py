@@ -0,0 +1,100 @@
+"""
+Stand-in Embedding Server
+
+Minimal OpenAI-compatible POST /v1/embeddings for benchmarking the
+semantic mode offline. Vectors are the local provider's hashed
+embeddings (deterministic, synonyms land close together), and an
+optional per-call latency stands in for the network round trip.
+
+    python -m benchmarks.embedding_server --port 8765 --latency-ms 40
+    OPENAI_API_KEY=x OPENAI_API_BASE=http://127.0.0.1:8765/v1 uvicorn main:app
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+from semantic_search import hashed_embedding
+
+
+class EmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, dim: int = 384, latency_ms: float = 0.0):
+        super().__init__(address, _Handler)
+        self.dim = dim
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+        self.texts = 0
+        self._lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: EmbeddingServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # no delayed-ACK stall between header and body writes
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+
+        with self.server._lock:
+            self.server.calls += 1
+            self.server.texts += len(texts)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        self._reply(200, {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i,
+                 "embedding": hashed_embedding(text, self.server.dim).tolist()}
+                for i, text in enumerate(texts)
+            ],
+        })
+
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, dim: int = 384,
+                 latency_ms: float = 0.0) -> Tuple[EmbeddingServer, str]:
+    """Serve in a background thread; returns the server and its OPENAI_API_BASE."""
+    server = EmbeddingServer((host, port), dim, latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = EmbeddingServer((args.host, args.port), args.dim, args.latency_ms)
+    print(f"[Bench] Embedding server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark Runner
+
+Per-function throughput of calculate_hybrid_similarity and
+calculate_match_score_detailed, and end-to-end latency of both match
+endpoints through an in-process TestClient, over synthetic pools of 1k,
+10k and 100k candidates (benchmarks.workload). Pools come from a fixed
+seed, so runs on the same commit are comparable.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000 10000 --repeat 10 --json results.json
+    python -m benchmarks.run --mode semantic --embedding-latency-ms 30
+
+Semantic mode starts the stand-in embedding server and points the
+OpenAI provider at it. The worker reads its settings when first
+imported, so the environment is set up before any worker module loads.
+The persistent embedding cache is disabled, and so are the result and
+pairwise similarity caches unless --caches is given, so by default every
+request is computed from a cold start.
+"""
+
+import argparse
+import os
+import platform
+import socket
+import statistics
+import time
+from typing import Any, Dict, List
+
+import orjson
+
+from benchmarks.workload import listing_pairs, match_request
+
+ENDPOINTS = {
+    "supply": "/match/supply-to-demands",
+    "demand": "/match/demand-to-supplies",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _configure(args):
+    """Environment for the worker modules; starts the embedding server in semantic mode."""
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    if not args.caches:
+        # Repeated identical requests would otherwise be served from these
+        os.environ["RESULT_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["PAIR_SIMILARITY_CACHE_SIZE"] = "0"
+    if args.mode != "semantic":
+        os.environ["OPENAI_API_KEY"] = ""
+        os.environ["HF_API_KEY"] = ""
+        return None
+
+    port = _free_port()
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_API_BASE"] = f"http://127.0.0.1:{port}/v1"
+
+    from benchmarks.embedding_server import start_server
+    server, base = start_server(port=port, latency_ms=args.embedding_latency_ms)
+    print(f"[Bench] Embedding server on {base} (latency {args.embedding_latency_ms} ms)")
+    return server
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        "runs": n,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(n - 1, round(0.95 * (n - 1)))] * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# Per-function throughput
+# ═══════════════════════════════════════════════════════════════
+
+def bench_functions(pair_count: int) -> List[Dict[str, Any]]:
+    from config import get_settings
+    from utils import calculate_hybrid_similarity, calculate_match_score_detailed
+
+    settings = get_settings()
+    pairs = listing_pairs(pair_count)
+    distances = [(i * 7.3) % 60.0 for i in range(pair_count)]
+    results = []
+
+    started = time.perf_counter()
+    similarities = [
+        calculate_hybrid_similarity(
+            supply["item_name"], demand["item_name"],
+            use_semantic=settings.USE_SEMANTIC_SEARCH,
+            semantic_weight=settings.SEMANTIC_WEIGHT,
+            fuzzy_weight=settings.FUZZY_WEIGHT,
+        )
+        for supply, demand in pairs
+    ]
+    results.append(("calculate_hybrid_similarity", time.perf_counter() - started))
+
+    started = time.perf_counter()
+    for (supply, demand), similarity, distance in zip(pairs, similarities, distances):
+        calculate_match_score_detailed(
+            distance_km=distance,
+            similarity_score=similarity,
+            supply_price=supply["price_per_unit"],
+            demand_max_price=demand["max_price_per_unit"],
+            max_distance=50.0,
+            supply_qty=supply["quantity"],
+            supply_unit=supply["quantity_unit"],
+            demand_qty=demand["quantity"],
+            demand_unit=demand["quantity_unit"],
+            price_tolerance=settings.PRICE_TOLERANCE_PERCENT,
+        )
+    results.append(("calculate_match_score_detailed", time.perf_counter() - started))
+
+    rows = []
+    for name, seconds in results:
+        rows.append({"function": name, "calls": pair_count, "seconds": round(seconds, 4),
+                     "calls_per_second": round(pair_count / seconds) if seconds else None})
+        print(f"[Bench] {name:<32} {pair_count:>8} calls  {seconds:8.3f} s  "
+              f"{rows[-1]['calls_per_second']:>10} calls/s")
+    return rows
+
+
+# ═══════════════════════════════════════════════════════════════
+# End-to-end latency
+# ═══════════════════════════════════════════════════════════════
+
+def bench_endpoints(sizes: List[int], repeat: int, warmup: int, seed: int, server=None) -> List[Dict[str, Any]]:
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    headers = {"content-type": "application/json"}
+    rows = []
+
+    for side, path in ENDPOINTS.items():
+        for size in sizes:
+            # Encoded once, so client-side JSON encoding is not part of the timing
+            payload = orjson.dumps(match_request(side, size, seed))
+            calls_before = server.calls if server else 0
+
+            for _ in range(warmup):
+                client.post(path, content=payload, headers=headers)
+
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.post(path, content=payload, headers=headers)
+                samples.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+            # One extra, profiled request for the per-stage breakdown
+            profiled = client.post(f"{path}?profile=true", content=payload, headers=headers).json()
+
+            row = {
+                "endpoint": path,
+                "candidates": size,
+                "payload_mb": round(len(payload) / 1e6, 2),
+                **_summary(samples),
+                "results": profiled["total_results"],
+                "stages_ms": profiled["profile"]["stages_ms"],
+                "candidates_per_stage": profiled["profile"]["candidates"],
+            }
+            if server:
+                row["embedding_api_calls"] = server.calls - calls_before
+            rows.append(row)
+            print(f"[Bench] {path:<28} n={size:>7}  mean {row['mean_ms']:9.1f} ms  "
+                  f"p50 {row['p50_ms']:9.1f} ms  p95 {row['p95_ms']:9.1f} ms  "
+                  f"{size / (row['mean_ms'] / 1000):>10.0f} cand/s  results {row['results']}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matching worker benchmarks")
+    parser.add_argument("--mode", choices=["fuzzy", "semantic"], default="fuzzy")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pairs", type=int, default=20_000,
+                        help="listing pairs for the per-function benchmarks (0 to skip)")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--caches", action="store_true",
+                        help="keep the result and similarity caches enabled (warm repeats)")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0,
+                        help="simulated round trip of the stand-in embedding server")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    server = _configure(args)
+    report = {
+        "mode": args.mode,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "functions": bench_functions(args.pairs) if args.pairs else [],
+        "endpoints": [] if args.skip_endpoints else
+            bench_endpoints(args.sizes, args.repeat, args.warmup, args.seed, server),
+    }
+
+    if args.json:
+        with open(args.json, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        print(f"[Bench] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
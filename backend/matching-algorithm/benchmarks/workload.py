@@ -0,0 +1,162 @@
+"""
+Synthetic Workloads
+
+Reproducible supply/demand pools shaped like production traffic: item
+names built from the synonym clusters in utils (so synonyms, plurals and
+multi-word terms all occur, a few items far more often than the rest),
+organisations spread around regional hubs, and a mix of mass, volume and
+count units with prices that sometimes fit the demand's budget and
+sometimes do not. Everything is plain JSON matching main.py's OrgData /
+SupplyData / DemandData, generated from a seed.
+"""
+
+import random
+from typing import Any, Dict, List, Tuple
+
+from utils import _SYNONYM_CLUSTERS
+
+# Category per cluster, keyed by the cluster's canonical (first) term
+CATEGORIES = {
+    "rice": "Food", "wheat": "Food", "oil": "Food", "sugar": "Food", "pulses": "Food",
+    "water": "Food", "food": "Food",
+    "steel": "Construction", "wood": "Construction", "cement": "Construction",
+    "brick": "Construction",
+    "pipe": "Plumbing", "pump": "Plumbing",
+    "generator": "Energy", "solar": "Energy", "battery": "Energy",
+    "wire": "Electrical",
+    "medical": "Medical", "mask": "Medical", "gloves": "Medical", "sanitizer": "Medical",
+    "tablet": "Medical",
+    "cotton": "Textiles",
+    "fertilizer": "Agriculture", "pesticide": "Agriculture",
+    "plastic": "Packaging", "paper": "Packaging",
+    "tarpaulin": "Shelter", "blanket": "Shelter",
+    "kit": "Relief",
+}
+CATEGORY_IDS = {name: i + 1 for i, name in enumerate(sorted(set(CATEGORIES.values()) | {"General"}))}
+
+VOLUME_ITEMS = {"oil", "water", "sanitizer"}
+COUNT_ITEMS = {"generator", "solar", "battery", "mask", "gloves", "tablet", "pump", "brick",
+               "tarpaulin", "blanket", "kit"}
+
+# (unit, typical quantity, typical price per unit)
+MASS_UNITS = [("kg", 500, 2.0), ("g", 20000, 0.004), ("ton", 5, 1500.0), ("tonne", 8, 1400.0)]
+VOLUME_UNITS = [("l", 800, 1.5), ("litre", 400, 1.6), ("ml", 50000, 0.002)]
+COUNT_UNITS = [("pcs", 300, 12.0), ("units", 150, 20.0), ("boxes", 60, 45.0)]
+
+MODIFIERS = ["", "", "", "bulk", "fresh", "used", "surplus", "grade A", "industrial",
+             "organic", "imported", "local"]
+SUFFIXES = ["", "", "", "bags", "rolls", "sheets", "bundles", "cartons", "lot"]
+
+# Regional hubs (lat, lon); orgs are scattered around them
+HUBS = [
+    (28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (13.08, 80.27), (22.57, 88.36),
+    (17.39, 78.49), (23.02, 72.57), (18.52, 73.86), (26.91, 75.79), (26.85, 80.95),
+    (21.15, 79.09), (15.30, 74.12),
+]
+HUB_SPREAD_DEG = 0.35
+
+# Zipf-like item popularity: a handful of clusters make up most listings
+_CLUSTER_WEIGHTS = [1.0 / (rank + 1) for rank in range(len(_SYNONYM_CLUSTERS))]
+
+
+def _item(rng: random.Random) -> Tuple[str, str, str]:
+    """(item name, canonical term, category) for one listing."""
+    cluster = rng.choices(_SYNONYM_CLUSTERS, weights=_CLUSTER_WEIGHTS)[0]
+    term = rng.choice(cluster)
+    words = [rng.choice(MODIFIERS), term, rng.choice(SUFFIXES)]
+    name = " ".join(w for w in words if w)
+    return name.title() if rng.random() < 0.5 else name, cluster[0], CATEGORIES.get(cluster[0], "General")
+
+
+def _quantity(rng: random.Random, canonical: str):
+    """(quantity, unit, typical unit price); about one listing in ten has no unit."""
+    if rng.random() < 0.1:
+        return None, None, 10.0
+    if canonical in VOLUME_ITEMS:
+        unit, qty, price = rng.choice(VOLUME_UNITS)
+    elif canonical in COUNT_ITEMS:
+        unit, qty, price = rng.choice(COUNT_UNITS)
+    else:
+        unit, qty, price = rng.choice(MASS_UNITS)
+    return round(qty * rng.lognormvariate(0, 0.6), 1), unit, price
+
+
+def make_org(rng: random.Random, org_id: int) -> Dict[str, Any]:
+    lat, lon = rng.choice(HUBS)
+    return {
+        "org_id": org_id,
+        "org_name": f"Org {org_id}",
+        "email": f"org{org_id}@example.org",
+        "latitude": round(lat + rng.gauss(0, HUB_SPREAD_DEG), 5),
+        "longitude": round(lon + rng.gauss(0, HUB_SPREAD_DEG), 5),
+    }
+
+
+def make_supply(rng: random.Random, supply_id: int, org_id: int) -> Dict[str, Any]:
+    name, canonical, category = _item(rng)
+    quantity, unit, price = _quantity(rng, canonical)
+    return {
+        "supply_id": supply_id,
+        "org_id": org_id,
+        "item_name": name,
+        "item_category": category,
+        "category_id": CATEGORY_IDS[category] if rng.random() < 0.8 else None,
+        "item_description": f"Available: {name}" if rng.random() < 0.5 else None,
+        "price_per_unit": round(price * rng.lognormvariate(0, 0.4), 3) if rng.random() < 0.9 else None,
+        "quantity": quantity,
+        "quantity_unit": unit,
+    }
+
+
+def make_demand(rng: random.Random, demand_id: int, org_id: int) -> Dict[str, Any]:
+    name, canonical, category = _item(rng)
+    quantity, unit, price = _quantity(rng, canonical)
+    return {
+        "demand_id": demand_id,
+        "org_id": org_id,
+        "item_name": name,
+        "item_category": category,
+        "category_id": CATEGORY_IDS[category] if rng.random() < 0.8 else None,
+        "item_description": f"Looking for {name}" if rng.random() < 0.5 else None,
+        "max_price_per_unit": round(price * rng.lognormvariate(0.1, 0.4), 3) if rng.random() < 0.8 else None,
+        "quantity": quantity,
+        "quantity_unit": unit,
+    }
+
+
+def make_pool(side: str, size: int, seed: int = 0,
+              listings_per_org: int = 5) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(orgs, listings) for a pool of `size` supplies or demands."""
+    rng = random.Random(f"{side}:{size}:{seed}")
+    make = make_supply if side == "supply" else make_demand
+    orgs = [make_org(rng, org_id) for org_id in range(1, max(1, size // listings_per_org) + 1)]
+    listings = [make(rng, i + 1, rng.choice(orgs)["org_id"]) for i in range(size)]
+    return orgs, listings
+
+
+def match_request(side: str, size: int, seed: int = 0, search_radius: float = 50.0) -> Dict[str, Any]:
+    """
+    Body for /match/supply-to-demands (side="supply") or
+    /match/demand-to-supplies (side="demand") with a pool of `size`.
+    """
+    other = "demand" if side == "supply" else "supply"
+    orgs, listings = make_pool(other, size, seed)
+    org_by_id = {org["org_id"]: org for org in orgs}
+
+    # Source at the centre of a hub, so its radius covers a dense area
+    rng = random.Random(f"source:{side}:{seed}")
+    lat, lon = HUBS[0]
+    source_org = {**make_org(rng, 10_000_000), "latitude": lat, "longitude": lon}
+    source = (make_supply if side == "supply" else make_demand)(rng, 10_000_000, source_org["org_id"])
+    return {
+        side: source,
+        f"{side}_org": source_org,
+        "search_radius": search_radius,
+        "candidates": [{other: listing, "org": org_by_id[listing["org_id"]]} for listing in listings],
+    }
+
+
+def listing_pairs(count: int, seed: int = 0) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(supply, demand) pairs for per-function benchmarks."""
+    rng = random.Random(f"pairs:{seed}")
+    return [(make_supply(rng, i, 1), make_demand(rng, i, 2)) for i in range(count)]
@@ -0,0 +1,177 @@
+"""
+Resident Candidate Store
+
+Keeps supplies, demands and their organisations in worker memory so match
+requests only need to send the source listing. Listings are held as
+PreparedListing objects, so tokens and embeddings computed for one search
+are reused by every later search, and each side's CandidatePool (with its
+coordinate columns, spatial and token indexes) is rebuilt only after a change.
+The ANN index over each side's embeddings is updated in place instead, from
+the set of listing ids that are new or changed since they were last indexed.
+"""
+
+from typing import Dict, List, Optional, Any
+
+from ann_index import IVFIndex
+from config import get_settings
+from matching import CandidatePool, PreparedListing
+
+settings = get_settings()
+
+SIDES = ("supply", "demand")
+
+
+class CandidateStore:
+    """In-memory supplies, demands and orgs with bulk upsert/delete."""
+
+    def __init__(self):
+        self.orgs: Dict[int, Any] = {}
+        self.listings: Dict[str, Dict[int, PreparedListing]] = {side: {} for side in SIDES}
+        self._pools: Dict[str, Optional[CandidatePool]] = {side: None for side in SIDES}
+        self._versions: Dict[str, int] = {side: 0 for side in SIDES}
+        self._ann: Dict[str, Optional[IVFIndex]] = {
+            side: IVFIndex(settings.ANN_LISTS, settings.ANN_N_PROBE) if settings.ANN_INDEX else None
+            for side in SIDES
+        }
+        self._ann_pending: Dict[str, set] = {side: set() for side in SIDES}
+
+    def _invalidate(self, side: Optional[str] = None):
+        for s in ([side] if side else SIDES):
+            if self._pools[s] is not None:
+                # Requests still holding the old pool must not re-add stale listings
+                self._pools[s].ann_index = None
+            self._pools[s] = None
+            self._versions[s] += 1
+
+    def _unindex(self, side: str, listing_ids: List[int]):
+        if self._ann[side] is not None:
+            self._ann[side].remove(listing_ids)
+        self._ann_pending[side].difference_update(listing_ids)
+
+    # ── Organisations ──
+
+    def upsert_orgs(self, orgs: List[Any]) -> int:
+        """Insert or replace orgs; listings of a replaced org pick up the new data."""
+        changed = set()
+        for org in orgs:
+            self.orgs[org.org_id] = org
+            changed.add(org.org_id)
+
+        for side in SIDES:
+            rebound = False
+            for item in self.listings[side].values():
+                if item.org.org_id in changed:
+                    item.org = self.orgs[item.org.org_id]
+                    rebound = True
+            if rebound:
+                self._invalidate(side)
+        return len(orgs)
+
+    def delete_orgs(self, org_ids: List[int]) -> int:
+        """Remove orgs together with all of their listings."""
+        ids = {i for i in org_ids if i in self.orgs}
+        for i in ids:
+            del self.orgs[i]
+
+        for side in SIDES:
+            stale = [lid for lid, item in self.listings[side].items() if item.org.org_id in ids]
+            for lid in stale:
+                del self.listings[side][lid]
+            if stale:
+                self._unindex(side, stale)
+                self._invalidate(side)
+        return len(ids)
+
+    # ── Listings ──
+
+    def upsert_listings(self, side: str, listings: List[Any]) -> List[int]:
+        """
+        Insert or replace listings of one side. Returns the ids that were
+        rejected because their org is not in the store.
+        """
+        rejected = []
+        added = []
+        retexted = []
+        items = self.listings[side]
+        for listing in listings:
+            org = self.orgs.get(listing.org_id)
+            if org is None:
+                rejected.append(getattr(listing, f"{side}_id"))
+                continue
+
+            item = PreparedListing(listing, org, side)
+            previous = items.get(item.listing_id)
+            if previous is not None:
+                item.reuse_text_work(previous)
+                if item.text != previous.text:
+                    retexted.append(item.listing_id)
+            else:
+                added.append(item.listing_id)
+            items[item.listing_id] = item
+
+        # New and changed texts are embedded and indexed on the next ANN search
+        self._unindex(side, retexted)
+        if self._ann[side] is not None:
+            self._ann_pending[side].update(added + retexted)
+        if len(rejected) < len(listings):
+            self._invalidate(side)
+        return rejected
+
+    def delete_listings(self, side: str, listing_ids: List[int]) -> int:
+        items = self.listings[side]
+        removed = []
+        for lid in listing_ids:
+            if items.pop(lid, None) is not None:
+                removed.append(lid)
+        if removed:
+            self._unindex(side, removed)
+            self._invalidate(side)
+        return len(removed)
+
+    def clear(self):
+        self.orgs.clear()
+        for side in SIDES:
+            self.listings[side].clear()
+            if self._ann[side] is not None:
+                self._ann[side].clear()
+            self._ann_pending[side].clear()
+        self._invalidate()
+
+    # ── Matching ──
+
+    def pool(self, side: str) -> CandidatePool:
+        """Current pool of one side; rebuilt lazily after any change."""
+        pool = self._pools[side]
+        if pool is None:
+            pool = CandidatePool(side, list(self.listings[side].values()), indexed=True,
+                                 ann_index=self._ann[side], ann_pending=self._ann_pending[side],
+                                 resident=True)
+            self._pools[side] = pool
+        return pool
+
+    def version(self, side: str) -> int:
+        """Changes whenever the side's pool does (part of result cache keys)."""
+        return self._versions[side]
+
+    def ann_stats(self) -> Dict[str, Optional[Dict[str, object]]]:
+        return {
+            side: dict(index.stats(), pending=len(self._ann_pending[side])) if index is not None else None
+            for side, index in self._ann.items()
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "orgs": len(self.orgs),
+            "supplies": len(self.listings["supply"]),
+            "demands": len(self.listings["demand"]),
+        }
+
+
+# Global instance
+_candidate_store = None
+
+def get_candidate_store() -> CandidateStore:
+    global _candidate_store
+    if _candidate_store is None:
+        _candidate_store = CandidateStore()
+    return _candidate_store
@@ -0,0 +1,113 @@
+"""
+Columnar Request Payloads
+
+Large candidate pools can be sent as parallel arrays (one list per field)
+instead of one JSON object per candidate, either as JSON or as msgpack.
+Each column is validated in a single pydantic pass and rows become plain
+named tuples, so no model is built per candidate. Organisations are sent
+once in their own table and referenced by org_id.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import msgpack
+import orjson
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class ColumnarPayloadError(ValueError):
+    """Malformed columnar payload; `status_code` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def decode_payload(body: bytes, content_type: Optional[str]) -> Dict[str, Any]:
+    """Decode a JSON or msgpack request body into a dict."""
+    media_type = (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+    if media_type in MSGPACK_CONTENT_TYPES:
+        decode = lambda data: msgpack.unpackb(data, raw=False)
+    elif media_type == JSON_CONTENT_TYPE:
+        decode = orjson.loads
+    else:
+        raise ColumnarPayloadError(
+            f"Unsupported content type '{media_type}'; send {JSON_CONTENT_TYPE} "
+            f"or {MSGPACK_CONTENT_TYPES[0]}",
+            status_code=415,
+        )
+
+    try:
+        payload = decode(body)
+    except (ValueError, TypeError) as e:
+        raise ColumnarPayloadError(f"Could not decode request body: {e}", status_code=400)
+
+    if not isinstance(payload, dict):
+        raise ColumnarPayloadError("Request body must be an object")
+    return payload
+
+
+@lru_cache(maxsize=None)
+def _named_row_type(name: str, fields: Tuple[str, ...]):
+    base = namedtuple(name, fields)
+
+    def __reduce__(self):
+        # Rebuilt by field list, so rows pickle into scoring worker processes
+        return _restore_row, (name, fields, tuple(self))
+
+    return type(name, (base,), {"__slots__": (), "__reduce__": __reduce__})
+
+
+def _restore_row(name: str, fields: Tuple[str, ...], values: tuple):
+    return _named_row_type(name, fields)(*values)
+
+
+def row_type(model: Type[BaseModel]):
+    """Named tuple with the model's fields, used as a lightweight row."""
+    return _named_row_type(f"{model.__name__}Row", tuple(model.model_fields))
+
+
+@lru_cache(maxsize=None)
+def _column_adapter(model: Type[BaseModel], field: str) -> TypeAdapter:
+    return TypeAdapter(List[model.model_fields[field].annotation])
+
+
+def rows_from_columns(model: Type[BaseModel], columns: Any, table: str) -> List[tuple]:
+    """
+    Validate a {field: [values]} table against `model` one column at a
+    time and return its rows as row_type(model) tuples. Missing optional
+    columns take the field default; unknown columns are ignored.
+    """
+    if not isinstance(columns, dict):
+        raise ColumnarPayloadError(f"'{table}' must be an object of parallel arrays")
+
+    lengths = {len(v) for v in columns.values() if isinstance(v, list)}
+    if len(lengths) > 1:
+        raise ColumnarPayloadError(f"Columns of '{table}' have different lengths: {sorted(lengths)}")
+    n = lengths.pop() if lengths else 0
+
+    values = []
+    for name, info in model.model_fields.items():
+        column = columns.get(name)
+        if column is None:
+            if info.is_required():
+                raise ColumnarPayloadError(f"'{table}' is missing required column '{name}'")
+            values.append([info.get_default(call_default_factory=True)] * n)
+            continue
+        if not isinstance(column, list):
+            raise ColumnarPayloadError(f"Column '{table}.{name}' must be an array")
+        try:
+            values.append(_column_adapter(model, name).validate_python(column))
+        except ValidationError as e:
+            first = e.errors()[0]
+            raise ColumnarPayloadError(
+                f"Invalid value in '{table}.{name}' at row {first['loc'][0]}: {first['msg']}"
+            )
+
+    make = row_type(model)._make
+    return [make(row) for row in zip(*values)]
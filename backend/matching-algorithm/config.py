@@ -22,10 +22,50 @@ class Settings(BaseSettings):
     # Price flexibility (allow 25% over max price for visibility)
     PRICE_TOLERANCE_PERCENT: float = 0.25
 
+    # Token/category prefilter (can change results): resident store / request-built pools
+    TOKEN_INDEX_PREFILTER: bool = True
+    TOKEN_INDEX_PREFILTER_REQUESTS: bool = False
+
+    # Process-pool scoring: 0 = score in the request's own process.
+    # Requests with fewer in-radius candidates than the minimum stay inline.
+    SCORING_WORKERS: int = 0
+    SCORING_CHUNK_SIZE: int = 2000
+    SCORING_PARALLEL_MIN_CANDIDATES: int = 5000
+
+    # Per-request profiling (?profile=true or X-Profile header): longest
+    # cProfile top-N list a request may ask for
+    PROFILE_TOP_N_MAX: int = 50
+
+    # Match-result cache: identical requests within the TTL reuse the
+    # computed results, concurrent identical requests share one
+    # computation. 0 entries disables it.
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_MAX_MB: float = 64.0
+    RESULT_CACHE_TTL_SECONDS: float = 60.0
+
+    # Hybrid similarity scores kept per unordered pair of listing texts
+    # (keyed by a fixed-size digest), shared by both match directions.
+    # Max entries; 0 disables it.
+    PAIR_SIMILARITY_CACHE_SIZE: int = 100_000
+
+    # Nearest-neighbour (IVF) shortlist for large resident-store searches
+    # (semantic mode); ANN_LISTS 0 = sqrt(listings), more probes = more recall
+    ANN_INDEX: bool = True
+    ANN_MIN_CANDIDATES: int = 20_000
+    ANN_CANDIDATES: int = 5000
+    ANN_LISTS: int = 0
+    ANN_N_PROBE: int = 32
+
+    # Spatial index (lat/lon grid) for the radius prefilter
+    # Pools smaller than this are scanned directly
+    SPATIAL_INDEX_MIN_CANDIDATES: int = 2000
+    SPATIAL_INDEX_CELL_DEG: float = 0.5
+
     # Semantic Search
     # Semantic Search Provider
-    # Options: "fuzzy_only", "huggingface", "openai"
+    # Options: "fuzzy_only", "local", "huggingface", "openai"
     # "fuzzy_only": Lightweight Levenshtein distance (Fastest, no API key needed)
+    # "local": In-process hashed word/char n-gram vectors (no network, no API key)
     # "huggingface": Uses Hugging Face Inference API (Requires HF_API_KEY)
     # "openai": Uses OpenAI Embeddings API (Requires OPENAI_API_KEY)
     SEMANTIC_PROVIDER: str = "fuzzy_only"
@@ -37,6 +77,25 @@ class Settings(BaseSettings):
     # Model Names (for API reference)
     HF_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     OPENAI_MODEL: str = "text-embedding-3-small"
+    # OpenAI-compatible endpoint (e.g. a proxy or the benchmark stand-in server)
+    OPENAI_API_BASE: str = "https://api.openai.com/v1"
+
+    # Vector size of the "local" provider
+    LOCAL_EMBEDDING_DIM: int = 512
+
+    # Texts per embedding API call when fetching in batches
+    EMBEDDING_BATCH_SIZE: int = 64
+    # Concurrent batch calls (and pooled connections) per worker process
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_TIMEOUT_SECONDS: float = 30.0
+
+    # In-memory embedding cache per worker process, by vector bytes
+    # (float32: ~10k OpenAI or ~43k local vectors at 64 MB)
+    EMBEDDING_MEMORY_CACHE_MB: float = 64.0
+
+    # Persistent embedding cache (SQLite, shared by all worker processes).
+    # Empty string disables it.
+    EMBEDDING_CACHE_PATH: str = "cache/embeddings.sqlite3"
 
     # Weights (Restored)
     USE_SEMANTIC_SEARCH: bool = True
@@ -45,8 +104,11 @@ class Settings(BaseSettings):
 
     @model_validator(mode='after')
     def check_semantic_config(self):
+        # Local provider is chosen explicitly and needs no key
+        if self.SEMANTIC_PROVIDER == "local":
+            self.USE_SEMANTIC_SEARCH = True
         # Auto-configure provider if keys are present
-        if self.OPENAI_API_KEY:
+        elif self.OPENAI_API_KEY:
             self.SEMANTIC_PROVIDER = "openai"
             self.USE_SEMANTIC_SEARCH = True
         elif self.HF_API_KEY:
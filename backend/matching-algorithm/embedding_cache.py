@@ -0,0 +1,220 @@
+"""
+Embedding Caches
+
+EmbeddingMemoryCache: per-process LRU of unit-length float32 vectors,
+bounded by the bytes the vectors take rather than an entry count (one
+1536-dim OpenAI vector is 6 KB, a 384-dim local one 1.5 KB).
+
+PersistentEmbeddingCache: SQLite-backed store of embedding vectors that
+survives worker restarts and deploys. Keyed by provider, model name and a
+hash of the normalized text. The database runs in WAL mode, so every
+worker process on the host can read it concurrently and share what the
+others have fetched.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_QUERY_CHUNK = 500
+
+
+class EmbeddingMemoryCache:
+    """
+    LRU of L2-normalized float32 vectors within a byte budget. Zero or
+    non-finite vectors (failed fetches) are never stored, so they are
+    retried on the next lookup instead of being served from cache.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(key: str, vec: np.ndarray) -> int:
+        return vec.nbytes + len(key)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return vec
+
+    def put(self, key: str, vec: np.ndarray) -> Optional[np.ndarray]:
+        """Store the normalized vector and return it; None (not stored) for failures."""
+        arr = np.asarray(vec, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        if not np.isfinite(norm) or norm == 0:
+            return None
+        arr = arr / np.float32(norm)
+        # Entries are shared with every caller
+        arr.flags.writeable = False
+        size = self._entry_size(key, arr)
+        if size > self.max_bytes:
+            return arr
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= self._entry_size(key, old)
+            self._entries[key] = arr
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                old_key, old_vec = self._entries.popitem(last=False)
+                self.bytes -= self._entry_size(old_key, old_vec)
+                self.evictions += 1
+        return arr
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+class PersistentEmbeddingCache:
+    """Embedding vectors stored as float32 blobs in a shared SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key        TEXT PRIMARY KEY,
+                provider   TEXT NOT NULL,
+                model      TEXT NOT NULL,
+                dim        INTEGER NOT NULL,
+                vector     BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> str:
+        """Stable key: provider + model + SHA-256 of the normalized text."""
+        digest = hashlib.sha256(text.lower().strip().encode("utf-8")).hexdigest()
+        return f"{provider}:{model}:{digest}"
+
+    def get_many(self, provider: str, model: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Look up many texts; returns {text: vector} for the ones on disk."""
+        if not texts:
+            return {}
+
+        by_key = {self.make_key(provider, model, t): t for t in texts}
+        keys = list(by_key)
+        found: Dict[str, np.ndarray] = {}
+
+        try:
+            with self._lock:
+                for start in range(0, len(keys), _QUERY_CHUNK):
+                    chunk = keys[start:start + _QUERY_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[by_key[key]] = np.frombuffer(blob, dtype=np.float32)
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"[EmbeddingCache] Read failed: {e}")
+            return {}
+
+        self.hits += len(found)
+        self.misses += len(by_key) - len(found)
+        return found
+
+    def put_many(self, provider: str, model: str, vectors: Dict[str, np.ndarray]):
+        """Store {text: vector}; existing entries are replaced."""
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = []
+        for text, vec in vectors.items():
+            arr = np.asarray(vec, dtype=np.float32)
+            rows.append((self.make_key(provider, model, text), provider, model, arr.size, arr.tobytes(), now))
+
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, provider, model, dim, vector, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+            self.writes += len(rows)
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"[EmbeddingCache] Write failed: {e}")
+
+    def entry_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": self.entry_count(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
+
+
+def open_embedding_cache(path: Optional[str]) -> Optional[PersistentEmbeddingCache]:
+    """Open the cache at `path`; None when disabled or the file can't be opened."""
+    if not path:
+        return None
+    try:
+        return PersistentEmbeddingCache(path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[EmbeddingCache] Disabled, could not open {path}: {e}")
+        return None
@@ -17,19 +17,35 @@ Architecture:
                                                Store in Cache
 """
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
-
-from utils import (
-    calculate_distance,
-    calculate_hybrid_similarity,
-    calculate_match_score_detailed,
-    tokenize,
-    calculate_token_overlap,
+from typing import Any, Callable, Dict, List, Optional
+import orjson
+from pydantic import BaseModel, Field, ValidationError
+
+from matching import (
+    CandidatePool,
+    PreparedListing,
+    iter_scored_chunks,
+    score_candidates_async,
+    shutdown_scoring_executor,
 )
+from candidate_store import get_candidate_store
+from columnar import ColumnarPayloadError, decode_payload, rows_from_columns
+from metrics import (
+    MetricsMiddleware,
+    observe_candidates,
+    observe_parse,
+    render_metrics,
+    request_started,
+    stage_timer,
+)
+from profiling import RequestProfile, start_profile
+from result_cache import cached_results, get_result_cache
+from similarity_cache import get_similarity_cache
 import os
 
 
@@ -53,6 +69,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -107,6 +124,8 @@ class MatchSupplyRequest(BaseModel):
     supply: SupplyData
     supply_org: OrgData
     search_radius: float = 50.0
+    full_scan: bool = False  # skip the token/category shortlist
+    compact: bool = False  # ids + scores only, see COMPACT_FIELDS
     candidates: List[Candidate]
 
 
@@ -118,9 +137,103 @@ class MatchDemandRequest(BaseModel):
     demand: DemandData
     demand_org: OrgData
     search_radius: float = 50.0
+    full_scan: bool = False  # skip the token/category shortlist
+    compact: bool = False  # ids + scores only, see COMPACT_FIELDS
     candidates: List[Candidate]
 
 
+class MatchSupplyBatchRequest(BaseModel):
+    """Many supplies scored against one shared pool of demands"""
+    class Source(BaseModel):
+        supply: SupplyData
+        org: OrgData
+        search_radius: Optional[float] = None  # falls back to the request radius
+
+    sources: List[Source]
+    search_radius: float = 50.0
+    top_k: Optional[int] = Field(default=None, ge=1)
+    exclude_same_org: bool = True
+    full_scan: bool = False  # skip the token/category shortlist
+    compact: bool = False  # ids + scores only, see COMPACT_FIELDS
+    candidates: List[MatchSupplyRequest.Candidate]
+
+
+class MatchDemandBatchRequest(BaseModel):
+    """Many demands scored against one shared pool of supplies"""
+    class Source(BaseModel):
+        demand: DemandData
+        org: OrgData
+        search_radius: Optional[float] = None  # falls back to the request radius
+
+    sources: List[Source]
+    search_radius: float = 50.0
+    top_k: Optional[int] = Field(default=None, ge=1)
+    exclude_same_org: bool = True
+    full_scan: bool = False  # skip the token/category shortlist
+    compact: bool = False  # ids + scores only, see COMPACT_FIELDS
+    candidates: List[MatchDemandRequest.Candidate]
+
+
+class ColumnarMatchSupplyRequest(BaseModel):
+    """
+    Supply → Demands with the candidate pool as parallel arrays: `orgs`
+    holds OrgData columns, `candidates` DemandData columns (org_id links
+    them). Sent as JSON or msgpack to /match/columnar/supply-to-demands.
+    """
+    supply: SupplyData
+    supply_org: OrgData
+    search_radius: float = 50.0
+    full_scan: bool = False
+    compact: bool = False
+    orgs: Dict[str, Any]
+    candidates: Dict[str, Any]
+
+
+class ColumnarMatchDemandRequest(BaseModel):
+    """Demand → Supplies with the candidate pool as parallel arrays (SupplyData columns)."""
+    demand: DemandData
+    demand_org: OrgData
+    search_radius: float = 50.0
+    full_scan: bool = False
+    compact: bool = False
+    orgs: Dict[str, Any]
+    candidates: Dict[str, Any]
+
+
+class StoreOrgsUpsert(BaseModel):
+    orgs: List[OrgData]
+
+
+class StoreSuppliesUpsert(BaseModel):
+    supplies: List[SupplyData]
+
+
+class StoreDemandsUpsert(BaseModel):
+    demands: List[DemandData]
+
+
+class StoreDeleteRequest(BaseModel):
+    ids: List[int]
+
+
+class StoreMatchSupplyRequest(BaseModel):
+    """Supply → Demands against the resident store (no candidate list)"""
+    supply: SupplyData
+    supply_org: Optional[OrgData] = None  # looked up in the store when omitted
+    search_radius: float = 50.0
+    full_scan: bool = False  # skip the token/category shortlist
+    compact: bool = False  # ids + scores only, see COMPACT_FIELDS
+
+
+class StoreMatchDemandRequest(BaseModel):
+    """Demand → Supplies against the resident store (no candidate list)"""
+    demand: DemandData
+    demand_org: Optional[OrgData] = None  # looked up in the store when omitted
+    search_radius: float = 50.0
+    full_scan: bool = False  # skip the token/category shortlist
+    compact: bool = False  # ids + scores only, see COMPACT_FIELDS
+
+
 class ScoreBreakdown(BaseModel):
     """Detailed score breakdown for frontend display"""
     similarity: float = 0.0
@@ -168,65 +281,46 @@ class MatchResponse(BaseModel):
     total_results: int
     results: List[MatchResult]
     computed_at: str
+    profile: Optional[Dict[str, Any]] = None  # only when profiling was requested
 
 
-# ═══════════════════════════════════════════════════════════════
-# Shared Matching Logic
-# ═══════════════════════════════════════════════════════════════
+class BatchSourceResult(BaseModel):
+    """Top-K results for one source of a batch request"""
+    source_id: int
+    total_results: int
+    results: List[MatchResult]
 
-def check_category_match(
-    cat_id_a: Optional[int],
-    cat_id_b: Optional[int],
-    cat_name_a: Optional[str],
-    cat_name_b: Optional[str],
-) -> bool:
-    """
-    Consistent category matching used in BOTH directions.
-    1. ID match (exact)
-    2. String exact match (case-insensitive)
-    3. Substring containment (e.g., "Grains" in "Grains & Flour")
-    """
-    # ID match
-    if cat_id_a is not None and cat_id_b is not None:
-        if cat_id_a == cat_id_b:
-            return True
-    
-    # String match
-    a = (cat_name_a or "").lower().strip()
-    b = (cat_name_b or "").lower().strip()
-    
-    if not a or not b:
-        return False
-    
-    # Exact string
-    if a == b:
-        return True
-    
-    # Substring containment
-    if a in b or b in a:
-        return True
-    
-    return False
-
-
-def build_rich_text(item_name: str, item_description: str = None, item_category: str = None) -> str:
-    """Build rich comparison text from item fields."""
-    parts = [item_name or ""]
-    if item_description:
-        parts.append(item_description)
-    if item_category:
-        parts.append(item_category)
-    return " ".join(parts).strip()
-
-
-# Minimum score to include in results (lower = more results)
-MIN_MATCH_SCORE = 0.25
+
+class MatchBatchResponse(BaseModel):
+    """Worker response for a batch request, one entry per source"""
+    total_sources: int
+    sources: List[BatchSourceResult]
+    computed_at: str
+    profile: Optional[Dict[str, Any]] = None  # only when profiling was requested
+
+
+class StoreUpsertResponse(BaseModel):
+    upserted: int
+    rejected_ids: List[int] = []  # listings whose org is not in the store
+    store: Dict[str, int]
+
+
+class StoreDeleteResponse(BaseModel):
+    deleted: int
+    store: Dict[str, int]
 
 
 # ═══════════════════════════════════════════════════════════════
 # Endpoints
 # ═══════════════════════════════════════════════════════════════
 
+@app.on_event("shutdown")
+async def shutdown():
+    from semantic_search import close_semantic_matcher
+    await close_semantic_matcher()
+    shutdown_scoring_executor()
+
+
 @app.get("/", tags=["Root"])
 async def root():
     return {
@@ -241,125 +335,122 @@ async def health():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 
-@app.post("/match/supply-to-demands", response_model=MatchResponse, tags=["Matching"])
-async def match_supply_to_demands(request: MatchSupplyRequest):
+@app.get("/embeddings/stats", tags=["Health"])
+async def embedding_stats():
+    from semantic_search import get_semantic_matcher
+    return get_semantic_matcher().cache_stats()
+
+
+@app.get("/results/cache", tags=["Health"])
+async def result_cache_stats():
+    cache = get_result_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.delete("/results/cache", tags=["Health"])
+async def result_cache_clear():
+    cache = get_result_cache()
+    if cache is not None:
+        cache.clear()
+    return {"cleared": cache is not None}
+
+
+@app.get("/similarity/cache", tags=["Health"])
+async def similarity_cache_stats():
+    cache = get_similarity_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.get("/metrics", tags=["Health"])
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (request, stage latency, filter and embedding metrics)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+async def _request_profile(
+    profile: bool = False,
+    profile_top: int = 0,
+    x_profile: Optional[str] = Header(None),
+    x_profile_top: Optional[int] = Header(None),
+):
+    """
+    Opt-in profiling via ?profile=true or an X-Profile header; profile_top
+    (or X-Profile-Top) adds that many cProfile entries, up to
+    PROFILE_TOP_N_MAX. The report is added to the response as "profile".
+    """
+    if not (profile or (x_profile or "").strip().lower() in ("1", "true", "yes", "on")):
+        yield None
+        return
+
+    top_n = min(max(profile_top or x_profile_top or 0, 0), settings.PROFILE_TOP_N_MAX)
+    profiler = start_profile(top_n, started=request_started())
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+# Compact mode: one array per result instead of a full MatchResult object
+COMPACT_FIELDS = ["id", "org_id", "match_score", "distance_km", "breakdown"]
+BREAKDOWN_FIELDS = ["similarity", "distance", "price", "quantity"]
+
+
+def _compact_row(row: Dict[str, Any]) -> List[Any]:
+    breakdown = row["score_breakdown"]
+    return [
+        row["id"], row["org_id"], row["match_score"], row["distance_km"],
+        [breakdown[field] for field in BREAKDOWN_FIELDS],
+    ]
+
+
+def _match_response(rows: List[Dict[str, Any]], compact: bool,
+                    profiler: Optional[RequestProfile] = None) -> ORJSONResponse:
+    """
+    Serialize result rows with orjson. Rows already have the MatchResult
+    layout, so they skip pydantic validation on the way out.
+    """
+    content = {"total_results": len(rows)}
+    if compact:
+        content.update(
+            fields=COMPACT_FIELDS,
+            breakdown_fields=BREAKDOWN_FIELDS,
+            results=[_compact_row(row) for row in rows],
+        )
+    else:
+        content["results"] = rows
+    content["computed_at"] = datetime.utcnow().isoformat()
+    if profiler is not None:
+        content["profile"] = profiler.report()
+    with stage_timer("serialize"):
+        return ORJSONResponse(content)
+
+
+@app.post("/match/supply-to-demands", response_model=MatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def match_supply_to_demands(request: MatchSupplyRequest, http_request: Request,
+                                  profiler: Optional[RequestProfile] = Depends(_request_profile)):
     """
     Compute matches: Supply → Demands.
     Returns scored results with personalized breakdowns.
     """
+    observe_parse()
+    observe_candidates("/match/supply-to-demands", len(request.candidates))
     try:
         supply = request.supply
-        supply_org = request.supply_org
         search_radius = request.search_radius
-        results = []
 
         print(f"[Worker] Processing Supply→Demands for Supply ID: {supply.supply_id}. "
               f"Candidates: {len(request.candidates)}. Radius: {search_radius}km")
 
-        supply_text = build_rich_text(supply.item_name, supply.item_description, supply.item_category)
-
-        for candidate in request.candidates:
-            dem = candidate.demand
-            org = candidate.org
-
-            try:
-                # Distance
-                distance_km = calculate_distance(
-                    supply_org.latitude, supply_org.longitude,
-                    org.latitude, org.longitude
-                )
-
-                if distance_km > search_radius:
-                    continue
-
-                # Category match (consistent logic)
-                cat_match = check_category_match(
-                    supply.category_id, dem.category_id,
-                    supply.item_category, dem.item_category
-                )
-
-                # Build rich text for similarity
-                demand_text = build_rich_text(dem.item_name, dem.item_description, dem.item_category)
-
-                # Hybrid similarity
-                try:
-                    name_similarity = calculate_hybrid_similarity(
-                        supply_text,
-                        demand_text,
-                        use_semantic=settings.USE_SEMANTIC_SEARCH,
-                        semantic_weight=settings.SEMANTIC_WEIGHT,
-                        fuzzy_weight=settings.FUZZY_WEIGHT
-                    )
-                except Exception as e:
-                    print(f"[Worker] Similarity calc failed: {e}")
-                    name_similarity = 0.0
-
-                # Skip only if NEITHER category nor name matches
-                if not cat_match and name_similarity < settings.SIMILARITY_THRESHOLD:
-                    continue
-
-                # Category boost: moderate, not overwhelming
-                if cat_match:
-                    effective_sim = max(name_similarity, 0.65)
-                    # Additional boost proportional to name similarity
-                    effective_sim = min(1.0, effective_sim + 0.15)
-                else:
-                    effective_sim = name_similarity
-
-                # Detailed match score with breakdown
-                score_detail = calculate_match_score_detailed(
-                    distance_km=distance_km,
-                    similarity_score=effective_sim,
-                    supply_price=supply.price_per_unit,
-                    demand_max_price=dem.max_price_per_unit,
-                    max_distance=search_radius,
-                    supply_qty=supply.quantity,
-                    supply_unit=supply.quantity_unit,
-                    demand_qty=dem.quantity,
-                    demand_unit=dem.quantity_unit,
-                    price_tolerance=settings.PRICE_TOLERANCE_PERCENT
-                )
-
-                match_score = score_detail["match_score"]
-
-                if match_score < MIN_MATCH_SCORE:
-                    continue
-
-                results.append(MatchResult(
-                    id=dem.demand_id,
-                    org_id=org.org_id,
-                    org_name=org.org_name,
-                    item_name=dem.item_name,
-                    item_category=dem.item_category,
-                    item_description=dem.item_description,
-                    price=dem.max_price_per_unit,
-                    currency=dem.currency,
-                    quantity=dem.quantity,
-                    quantity_unit=dem.quantity_unit,
-                    distance_km=round(distance_km, 2),
-                    name_similarity=round(effective_sim, 3),
-                    match_score=round(match_score, 3),
-                    score_breakdown=ScoreBreakdown(**score_detail["breakdown"]),
-                    match_labels=MatchLabels(**score_detail["labels"]),
-                    category_matched=cat_match,
-                    org_email=org.email,
-                    org_phone=org.phone_number,
-                    org_address=org.address,
-                    org_latitude=org.latitude,
-                    org_longitude=org.longitude,
-                ))
-            except Exception as item_err:
-                print(f"[Worker] Skipping candidate due to error: {item_err}")
-                continue
-
-        results.sort(key=lambda x: x.match_score, reverse=True)
-        results = results[:settings.MAX_RESULTS]
-
-        return MatchResponse(
-            total_results=len(results),
-            results=results,
-            computed_at=datetime.utcnow().isoformat()
-        )
+        async def compute():
+            source = PreparedListing(supply, request.supply_org, "supply")
+            pool = CandidatePool.from_candidates(request.candidates, "demand")
+            return await score_candidates_async(source, pool, search_radius, limit=settings.MAX_RESULTS,
+                                                full_scan=request.full_scan)
+
+        rows = await cached_results((http_request.url.path, await http_request.body()), compute)
+        return _match_response(rows, request.compact, profiler)
 
     except Exception as e:
         print(f"[Worker] supply→demand matching error: {e}")
@@ -369,122 +460,31 @@ async def match_supply_to_demands(request: MatchSupplyRequest):
         )
 
 
-@app.post("/match/demand-to-supplies", response_model=MatchResponse, tags=["Matching"])
-async def match_demand_to_supplies(request: MatchDemandRequest):
+@app.post("/match/demand-to-supplies", response_model=MatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def match_demand_to_supplies(request: MatchDemandRequest, http_request: Request,
+                                   profiler: Optional[RequestProfile] = Depends(_request_profile)):
     """
     Compute matches: Demand → Supplies.
     Returns scored results with personalized breakdowns.
     """
+    observe_parse()
+    observe_candidates("/match/demand-to-supplies", len(request.candidates))
     try:
         demand = request.demand
-        demand_org = request.demand_org
         search_radius = request.search_radius
-        results = []
 
         print(f"[Worker] Processing Demand→Supplies for Demand ID: {demand.demand_id}. "
               f"Candidates: {len(request.candidates)}. Radius: {search_radius}km")
 
-        demand_text = build_rich_text(demand.item_name, demand.item_description, demand.item_category)
-
-        for candidate in request.candidates:
-            sup = candidate.supply
-            org = candidate.org
-
-            try:
-                distance_km = calculate_distance(
-                    demand_org.latitude, demand_org.longitude,
-                    org.latitude, org.longitude
-                )
-
-                if distance_km > search_radius:
-                    continue
-
-                # Category match (same consistent logic)
-                cat_match = check_category_match(
-                    demand.category_id, sup.category_id,
-                    demand.item_category, sup.item_category
-                )
-
-                # Build rich text
-                supply_text = build_rich_text(sup.item_name, sup.item_description, sup.item_category)
-
-                # Hybrid similarity
-                try:
-                    name_similarity = calculate_hybrid_similarity(
-                        demand_text,
-                        supply_text,
-                        use_semantic=settings.USE_SEMANTIC_SEARCH,
-                        semantic_weight=settings.SEMANTIC_WEIGHT,
-                        fuzzy_weight=settings.FUZZY_WEIGHT
-                    )
-                except Exception as e:
-                    print(f"[Worker] Similarity calc failed: {e}")
-                    name_similarity = 0.0
-
-                if not cat_match and name_similarity < settings.SIMILARITY_THRESHOLD:
-                    continue
-
-                # Category boost: moderate
-                if cat_match:
-                    effective_sim = max(name_similarity, 0.65)
-                    effective_sim = min(1.0, effective_sim + 0.15)
-                else:
-                    effective_sim = name_similarity
-
-                # Detailed score
-                score_detail = calculate_match_score_detailed(
-                    distance_km=distance_km,
-                    similarity_score=effective_sim,
-                    supply_price=sup.price_per_unit,
-                    demand_max_price=demand.max_price_per_unit,
-                    max_distance=search_radius,
-                    supply_qty=sup.quantity,
-                    supply_unit=sup.quantity_unit,
-                    demand_qty=demand.quantity,
-                    demand_unit=demand.quantity_unit,
-                    price_tolerance=settings.PRICE_TOLERANCE_PERCENT
-                )
-
-                match_score = score_detail["match_score"]
-
-                if match_score < MIN_MATCH_SCORE:
-                    continue
-
-                results.append(MatchResult(
-                    id=sup.supply_id,
-                    org_id=org.org_id,
-                    org_name=org.org_name,
-                    item_name=sup.item_name,
-                    item_category=sup.item_category,
-                    item_description=sup.item_description,
-                    price=sup.price_per_unit,
-                    currency=sup.currency,
-                    quantity=sup.quantity,
-                    quantity_unit=sup.quantity_unit,
-                    distance_km=round(distance_km, 2),
-                    name_similarity=round(effective_sim, 3),
-                    match_score=round(match_score, 3),
-                    score_breakdown=ScoreBreakdown(**score_detail["breakdown"]),
-                    match_labels=MatchLabels(**score_detail["labels"]),
-                    category_matched=cat_match,
-                    org_email=org.email,
-                    org_phone=org.phone_number,
-                    org_address=org.address,
-                    org_latitude=org.latitude,
-                    org_longitude=org.longitude,
-                ))
-            except Exception as item_err:
-                print(f"[Worker] Skipping candidate due to error: {item_err}")
-                continue
-
-        results.sort(key=lambda x: x.match_score, reverse=True)
-        results = results[:settings.MAX_RESULTS]
-
-        return MatchResponse(
-            total_results=len(results),
-            results=results,
-            computed_at=datetime.utcnow().isoformat()
-        )
+        async def compute():
+            source = PreparedListing(demand, request.demand_org, "demand")
+            pool = CandidatePool.from_candidates(request.candidates, "supply")
+            return await score_candidates_async(source, pool, search_radius, limit=settings.MAX_RESULTS,
+                                                full_scan=request.full_scan)
+
+        rows = await cached_results((http_request.url.path, await http_request.body()), compute)
+        return _match_response(rows, request.compact, profiler)
 
     except Exception as e:
         print(f"[Worker] demand→supply matching error: {e}")
@@ -494,6 +494,463 @@ async def match_demand_to_supplies(request: MatchDemandRequest):
         )
 
 
+async def _run_batch(key_parts: tuple, prepare: Callable[[], tuple],
+               top_k: int, exclude_same_org: bool, full_scan: bool = False,
+               compact: bool = False, profiler: Optional[RequestProfile] = None) -> ORJSONResponse:
+    """
+    Score each source against the shared pool and keep its top K.
+    `prepare()` returns (sources, radii, pool) and only runs when the
+    result cache has nothing for `key_parts`.
+    """
+    async def compute():
+        sources, radii, pool = prepare()
+        entries = []
+        for source, radius in zip(sources, radii):
+            rows = await score_candidates_async(
+                source, pool, radius,
+                limit=top_k,
+                exclude_org_id=source.org.org_id if exclude_same_org else None,
+                full_scan=full_scan,
+            )
+            entries.append({
+                "source_id": source.listing_id,
+                "total_results": len(rows),
+                "results": [_compact_row(row) for row in rows] if compact else rows,
+            })
+        return entries
+
+    entries = await cached_results(key_parts, compute)
+
+    content = {
+        "total_sources": len(entries),
+        "sources": entries,
+        "computed_at": datetime.utcnow().isoformat(),
+    }
+    if compact:
+        content.update(fields=COMPACT_FIELDS, breakdown_fields=BREAKDOWN_FIELDS)
+    if profiler is not None:
+        content["profile"] = profiler.report()
+    with stage_timer("serialize"):
+        return ORJSONResponse(content)
+
+
+@app.post("/match/batch/supplies-to-demands", response_model=MatchBatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def match_supplies_to_demands_batch(request: MatchSupplyBatchRequest, http_request: Request,
+                                          profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Compute matches for many supplies against one shared pool of demands.
+    Candidate text, tokens and embeddings are prepared once for all sources.
+    """
+    observe_parse()
+    observe_candidates("/match/batch/supplies-to-demands", len(request.candidates))
+    try:
+        print(f"[Worker] Processing batch Supplies→Demands. Sources: {len(request.sources)}. "
+              f"Candidates: {len(request.candidates)}")
+
+        def prepare():
+            sources = [PreparedListing(s.supply, s.org, "supply") for s in request.sources]
+            radii = [s.search_radius if s.search_radius is not None else request.search_radius
+                     for s in request.sources]
+            return sources, radii, CandidatePool.from_candidates(request.candidates, "demand", indexed=True)
+
+        return await _run_batch((http_request.url.path, await http_request.body()), prepare,
+                                request.top_k or settings.MAX_RESULTS, request.exclude_same_org,
+                                request.full_scan, request.compact, profiler)
+
+    except Exception as e:
+        print(f"[Worker] batch supply→demand matching error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@app.post("/match/batch/demands-to-supplies", response_model=MatchBatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def match_demands_to_supplies_batch(request: MatchDemandBatchRequest, http_request: Request,
+                                          profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Compute matches for many demands against one shared pool of supplies.
+    Candidate text, tokens and embeddings are prepared once for all sources.
+    """
+    observe_parse()
+    observe_candidates("/match/batch/demands-to-supplies", len(request.candidates))
+    try:
+        print(f"[Worker] Processing batch Demands→Supplies. Sources: {len(request.sources)}. "
+              f"Candidates: {len(request.candidates)}")
+
+        def prepare():
+            sources = [PreparedListing(s.demand, s.org, "demand") for s in request.sources]
+            radii = [s.search_radius if s.search_radius is not None else request.search_radius
+                     for s in request.sources]
+            return sources, radii, CandidatePool.from_candidates(request.candidates, "supply", indexed=True)
+
+        return await _run_batch((http_request.url.path, await http_request.body()), prepare,
+                                request.top_k or settings.MAX_RESULTS, request.exclude_same_org,
+                                request.full_scan, request.compact, profiler)
+
+    except Exception as e:
+        print(f"[Worker] batch demand→supply matching error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+# ═══════════════════════════════════════════════════════════════
+# Streaming Matching (NDJSON)
+# ═══════════════════════════════════════════════════════════════
+
+def _ndjson(record: Any) -> bytes:
+    return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+
+
+def _stream_matches(source: PreparedListing, pool: CandidatePool, search_radius: float,
+                    full_scan: bool, compact: bool, summary: bool,
+                    profiler: Optional[RequestProfile] = None) -> StreamingResponse:
+    """
+    Every match within radius as newline-delimited JSON, one result per
+    line, written chunk by chunk (ranked within each chunk, not overall).
+    The optional last line is {"summary": {...}} (carrying the profile
+    report when profiling; without a summary the profile gets its own
+    {"profile": {...}} line). A failure after the first line is reported
+    as {"error": "..."} since the status is sent.
+    """
+    async def lines():
+        total = 0
+        chunks = 0
+        try:
+            async for rows in iter_scored_chunks(source, pool, search_radius, full_scan=full_scan):
+                chunks += 1
+                total += len(rows)
+                if rows:
+                    with stage_timer("serialize"):
+                        chunk = b"".join(_ndjson(_compact_row(row) if compact else row) for row in rows)
+                    yield chunk
+        except Exception as e:
+            print(f"[Worker] streaming match error: {e}")
+            yield _ndjson({"error": str(e)})
+            return
+
+        if summary:
+            record = {"total_results": total, "candidates": len(pool), "chunks": chunks}
+            if compact:
+                record.update(fields=COMPACT_FIELDS, breakdown_fields=BREAKDOWN_FIELDS)
+            record["computed_at"] = datetime.utcnow().isoformat()
+            if profiler is not None:
+                record["profile"] = profiler.report()
+            yield _ndjson({"summary": record})
+        elif profiler is not None:
+            yield _ndjson({"profile": profiler.report()})
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/match/stream/supply-to-demands", tags=["Matching"])
+async def stream_supply_to_demands(request: MatchSupplyRequest, summary: bool = True,
+                                   profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Stream every Demand within radius of a Supply as NDJSON (no
+    MAX_RESULTS cap), for exports over large pools.
+    """
+    observe_parse()
+    observe_candidates("/match/stream/supply-to-demands", len(request.candidates))
+    supply = request.supply
+    print(f"[Worker] Streaming Supply→Demands for Supply ID: {supply.supply_id}. "
+          f"Candidates: {len(request.candidates)}. Radius: {request.search_radius}km")
+
+    source = PreparedListing(supply, request.supply_org, "supply")
+    pool = CandidatePool.from_candidates(request.candidates, "demand")
+    return _stream_matches(source, pool, request.search_radius,
+                           request.full_scan, request.compact, summary, profiler)
+
+
+@app.post("/match/stream/demand-to-supplies", tags=["Matching"])
+async def stream_demand_to_supplies(request: MatchDemandRequest, summary: bool = True,
+                                    profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Stream every Supply within radius of a Demand as NDJSON (no
+    MAX_RESULTS cap), for exports over large pools.
+    """
+    observe_parse()
+    observe_candidates("/match/stream/demand-to-supplies", len(request.candidates))
+    demand = request.demand
+    print(f"[Worker] Streaming Demand→Supplies for Demand ID: {demand.demand_id}. "
+          f"Candidates: {len(request.candidates)}. Radius: {request.search_radius}km")
+
+    source = PreparedListing(demand, request.demand_org, "demand")
+    pool = CandidatePool.from_candidates(request.candidates, "supply")
+    return _stream_matches(source, pool, request.search_radius,
+                           request.full_scan, request.compact, summary, profiler)
+
+
+# ═══════════════════════════════════════════════════════════════
+# Columnar Matching
+# ═══════════════════════════════════════════════════════════════
+
+async def _read_columnar(request: Request, model):
+    """Decode and validate a columnar request envelope (columns are checked later)."""
+    try:
+        payload = decode_payload(await request.body(), request.headers.get("content-type"))
+    except ColumnarPayloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    try:
+        return model.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+def _columnar_pool(orgs: Dict[str, Any], candidates: Dict[str, Any], listing_model, side: str) -> CandidatePool:
+    """Candidate pool straight from column tables; no pydantic model per row."""
+    try:
+        org_rows = {org.org_id: org for org in rows_from_columns(OrgData, orgs, "orgs")}
+        listings = rows_from_columns(listing_model, candidates, "candidates")
+        unknown = {l.org_id for l in listings} - org_rows.keys()
+        if unknown:
+            raise ColumnarPayloadError(f"Candidates reference orgs missing from 'orgs': {sorted(unknown)[:10]}")
+    except ColumnarPayloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    return CandidatePool(side, [PreparedListing(l, org_rows[l.org_id], side) for l in listings])
+
+
+@app.post("/match/columnar/supply-to-demands", response_model=MatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def match_supply_to_demands_columnar(request: Request,
+                                           profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Compute matches: Supply → Demands, candidates sent as columns
+    (ColumnarMatchSupplyRequest, JSON or msgpack).
+    """
+    async def compute():
+        # Decoded only on a cache miss; a hit skips parsing entirely
+        body = await _read_columnar(request, ColumnarMatchSupplyRequest)
+        pool = _columnar_pool(body.orgs, body.candidates, DemandData, "demand")
+        observe_parse()
+        observe_candidates("/match/columnar/supply-to-demands", len(pool))
+        supply = body.supply
+        print(f"[Worker] Processing columnar Supply→Demands for Supply ID: {supply.supply_id}. "
+              f"Candidates: {len(pool)}. Radius: {body.search_radius}km")
+
+        source = PreparedListing(supply, body.supply_org, "supply")
+        rows = await score_candidates_async(source, pool, body.search_radius, limit=settings.MAX_RESULTS,
+                                            full_scan=body.full_scan)
+        return {"rows": rows, "compact": body.compact}
+
+    try:
+        cached = await cached_results((request.url.path, request.headers.get("content-type"),
+                                       await request.body()), compute)
+        return _match_response(cached["rows"], cached["compact"], profiler)
+
+    except (HTTPException, RequestValidationError):
+        raise
+    except Exception as e:
+        print(f"[Worker] columnar supply→demand matching error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@app.post("/match/columnar/demand-to-supplies", response_model=MatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def match_demand_to_supplies_columnar(request: Request,
+                                            profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Compute matches: Demand → Supplies, candidates sent as columns
+    (ColumnarMatchDemandRequest, JSON or msgpack).
+    """
+    async def compute():
+        # Decoded only on a cache miss; a hit skips parsing entirely
+        body = await _read_columnar(request, ColumnarMatchDemandRequest)
+        pool = _columnar_pool(body.orgs, body.candidates, SupplyData, "supply")
+        observe_parse()
+        observe_candidates("/match/columnar/demand-to-supplies", len(pool))
+        demand = body.demand
+        print(f"[Worker] Processing columnar Demand→Supplies for Demand ID: {demand.demand_id}. "
+              f"Candidates: {len(pool)}. Radius: {body.search_radius}km")
+
+        source = PreparedListing(demand, body.demand_org, "demand")
+        rows = await score_candidates_async(source, pool, body.search_radius, limit=settings.MAX_RESULTS,
+                                            full_scan=body.full_scan)
+        return {"rows": rows, "compact": body.compact}
+
+    try:
+        cached = await cached_results((request.url.path, request.headers.get("content-type"),
+                                       await request.body()), compute)
+        return _match_response(cached["rows"], cached["compact"], profiler)
+
+    except (HTTPException, RequestValidationError):
+        raise
+    except Exception as e:
+        print(f"[Worker] columnar demand→supply matching error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+# ═══════════════════════════════════════════════════════════════
+# Resident Candidate Store
+# ═══════════════════════════════════════════════════════════════
+
+@app.get("/store", tags=["Store"])
+async def store_stats():
+    return get_candidate_store().stats()
+
+
+@app.get("/store/ann", tags=["Store"])
+async def store_ann_stats():
+    """Size and training state of each side's nearest-neighbour index."""
+    return get_candidate_store().ann_stats()
+
+
+@app.put("/store/orgs", response_model=StoreUpsertResponse, tags=["Store"])
+async def store_upsert_orgs(request: StoreOrgsUpsert):
+    store = get_candidate_store()
+    upserted = store.upsert_orgs(request.orgs)
+    return StoreUpsertResponse(upserted=upserted, store=store.stats())
+
+
+@app.put("/store/supplies", response_model=StoreUpsertResponse, tags=["Store"])
+async def store_upsert_supplies(request: StoreSuppliesUpsert):
+    store = get_candidate_store()
+    rejected = store.upsert_listings("supply", request.supplies)
+    return StoreUpsertResponse(
+        upserted=len(request.supplies) - len(rejected),
+        rejected_ids=rejected,
+        store=store.stats(),
+    )
+
+
+@app.put("/store/demands", response_model=StoreUpsertResponse, tags=["Store"])
+async def store_upsert_demands(request: StoreDemandsUpsert):
+    store = get_candidate_store()
+    rejected = store.upsert_listings("demand", request.demands)
+    return StoreUpsertResponse(
+        upserted=len(request.demands) - len(rejected),
+        rejected_ids=rejected,
+        store=store.stats(),
+    )
+
+
+@app.post("/store/orgs/delete", response_model=StoreDeleteResponse, tags=["Store"])
+async def store_delete_orgs(request: StoreDeleteRequest):
+    """Delete orgs and every listing that belongs to them."""
+    store = get_candidate_store()
+    deleted = store.delete_orgs(request.ids)
+    return StoreDeleteResponse(deleted=deleted, store=store.stats())
+
+
+@app.post("/store/supplies/delete", response_model=StoreDeleteResponse, tags=["Store"])
+async def store_delete_supplies(request: StoreDeleteRequest):
+    store = get_candidate_store()
+    deleted = store.delete_listings("supply", request.ids)
+    return StoreDeleteResponse(deleted=deleted, store=store.stats())
+
+
+@app.post("/store/demands/delete", response_model=StoreDeleteResponse, tags=["Store"])
+async def store_delete_demands(request: StoreDeleteRequest):
+    store = get_candidate_store()
+    deleted = store.delete_listings("demand", request.ids)
+    return StoreDeleteResponse(deleted=deleted, store=store.stats())
+
+
+@app.delete("/store", tags=["Store"])
+async def store_clear():
+    store = get_candidate_store()
+    store.clear()
+    return store.stats()
+
+
+def _resolve_store_org(org: Optional[OrgData], org_id: int) -> OrgData:
+    """Source org from the request, else from the store."""
+    if org is not None:
+        return org
+    stored = get_candidate_store().orgs.get(org_id)
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Organisation {org_id} is not in the store; send it or upsert it first."
+        )
+    return stored
+
+
+@app.post("/store/match/supply-to-demands", response_model=MatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def store_match_supply_to_demands(request: StoreMatchSupplyRequest, http_request: Request,
+                                        profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Compute matches: Supply → resident Demands.
+    Demands of the supply's own org are excluded.
+    """
+    supply = request.supply
+    supply_org = _resolve_store_org(request.supply_org, supply.org_id)
+    try:
+        store = get_candidate_store()
+        pool = store.pool("demand")
+        observe_parse()
+        observe_candidates("/store/match/supply-to-demands", len(pool))
+        print(f"[Worker] Processing store Supply→Demands for Supply ID: {supply.supply_id}. "
+              f"Candidates: {len(pool)}. Radius: {request.search_radius}km")
+
+        async def compute():
+            source = PreparedListing(supply, supply_org, "supply")
+            return await score_candidates_async(source, pool, request.search_radius,
+                                    limit=settings.MAX_RESULTS, exclude_org_id=supply.org_id,
+                                    full_scan=request.full_scan)
+
+        key_parts = (http_request.url.path, await http_request.body(),
+                     orjson.dumps(supply_org.model_dump()), store.version("demand"))
+        rows = await cached_results(key_parts, compute)
+        return _match_response(rows, request.compact, profiler)
+
+    except Exception as e:
+        print(f"[Worker] store supply→demand matching error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@app.post("/store/match/demand-to-supplies", response_model=MatchResponse,
+          response_class=ORJSONResponse, tags=["Matching"])
+async def store_match_demand_to_supplies(request: StoreMatchDemandRequest, http_request: Request,
+                                         profiler: Optional[RequestProfile] = Depends(_request_profile)):
+    """
+    Compute matches: Demand → resident Supplies.
+    Supplies of the demand's own org are excluded.
+    """
+    demand = request.demand
+    demand_org = _resolve_store_org(request.demand_org, demand.org_id)
+    try:
+        store = get_candidate_store()
+        pool = store.pool("supply")
+        observe_parse()
+        observe_candidates("/store/match/demand-to-supplies", len(pool))
+        print(f"[Worker] Processing store Demand→Supplies for Demand ID: {demand.demand_id}. "
+              f"Candidates: {len(pool)}. Radius: {request.search_radius}km")
+
+        async def compute():
+            source = PreparedListing(demand, demand_org, "demand")
+            return await score_candidates_async(source, pool, request.search_radius,
+                                    limit=settings.MAX_RESULTS, exclude_org_id=demand.org_id,
+                                    full_scan=request.full_scan)
+
+        key_parts = (http_request.url.path, await http_request.body(),
+                     orjson.dumps(demand_org.model_dump()), store.version("supply"))
+        rows = await cached_results(key_parts, compute)
+        return _match_response(rows, request.compact, profiler)
+
+    except Exception as e:
+        print(f"[Worker] store demand→supply matching error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,1064 @@
+"""
+Shared Matching Pipeline
+
+Scores a source listing (supply or demand) against a pool of candidate
+listings. Used by the single-source endpoints and by the batch endpoint.
+
+Everything that depends only on the candidate (rich text, tokens, embedding,
+org coordinates) is computed once per candidate and kept on the
+CandidatePool, so the same pool can be scored against many sources.
+"""
+
+import asyncio
+import heapq
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
+from typing import AsyncIterator, Generator, List, Optional, Dict, Any, Set, Tuple
+
+import numpy as np
+
+from utils import (
+    calculate_distances,
+    PRICE_LABELS,
+    QUANTITY_LABELS,
+    build_match_score_detail,
+    calculate_context_scores_columnar,
+    calculate_hybrid_similarity,
+    lean_match_score,
+    match_score_upper_bound_columnar,
+    normalize_quantity,
+    tokenize,
+    unit_class_code,
+)
+from ann_index import IVFIndex
+from spatial_index import GridIndex
+from token_index import TokenIndex
+from similarity_cache import get_similarity_cache, ordered_pair
+from config import get_settings
+import metrics
+
+settings = get_settings()
+
+# Minimum score to include in results (lower = more results)
+MIN_MATCH_SCORE = 0.25
+
+
+# ═══════════════════════════════════════════════════════════════
+# Category & Text Helpers
+# ═══════════════════════════════════════════════════════════════
+
+def check_category_match(
+    cat_id_a: Optional[int],
+    cat_id_b: Optional[int],
+    cat_name_a: Optional[str],
+    cat_name_b: Optional[str],
+) -> bool:
+    """
+    Consistent category matching used in BOTH directions.
+    1. ID match (exact)
+    2. String exact match (case-insensitive)
+    3. Substring containment (e.g., "Grains" in "Grains & Flour")
+    """
+    # ID match
+    if cat_id_a is not None and cat_id_b is not None:
+        if cat_id_a == cat_id_b:
+            return True
+
+    # String match
+    a = (cat_name_a or "").lower().strip()
+    b = (cat_name_b or "").lower().strip()
+
+    if not a or not b:
+        return False
+
+    # Exact string
+    if a == b:
+        return True
+
+    # Substring containment
+    if a in b or b in a:
+        return True
+
+    return False
+
+
+def build_rich_text(item_name: str, item_description: str = None, item_category: str = None) -> str:
+    """Build rich comparison text from item fields."""
+    parts = [item_name or ""]
+    if item_description:
+        parts.append(item_description)
+    if item_category:
+        parts.append(item_category)
+    return " ".join(parts).strip()
+
+
+# ═══════════════════════════════════════════════════════════════
+# Prepared Listings
+# ═══════════════════════════════════════════════════════════════
+
+class PreparedListing:
+    """
+    A supply or demand listing plus its org, with the work that does not
+    depend on the other side of the match cached on first use.
+    """
+
+    def __init__(self, listing, org, side: str):
+        self.listing = listing
+        self.org = org
+        self.side = side  # "supply" or "demand"
+        self._text: Optional[str] = None
+        self._tokens: Optional[Set[str]] = None
+        self._embedding: Optional[np.ndarray] = None
+
+    def __getstate__(self):
+        # Pickled for scoring workers, which are sent semantic scores: the
+        # embedding would only add IPC bytes
+        state = self.__dict__.copy()
+        state["_embedding"] = None
+        return state
+
+    def reuse_text_work(self, previous: "PreparedListing"):
+        """Carry over tokens/embedding from an older version with the same text."""
+        if previous.text == self.text:
+            self._tokens = previous._tokens
+            self._embedding = previous._embedding
+
+    @property
+    def listing_id(self) -> int:
+        if self.side == "supply":
+            return self.listing.supply_id
+        return self.listing.demand_id
+
+    @property
+    def price(self) -> Optional[float]:
+        """Asking price for a supply, budget for a demand."""
+        if self.side == "supply":
+            return self.listing.price_per_unit
+        return self.listing.max_price_per_unit
+
+    @property
+    def normalized_quantity(self) -> float:
+        """Quantity in its base unit (kg / l); NaN when missing."""
+        qty = normalize_quantity(self.listing.quantity, self.listing.quantity_unit)
+        return np.nan if qty is None else qty
+
+    @property
+    def unit_class(self) -> int:
+        return unit_class_code(self.listing.quantity_unit)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = build_rich_text(
+                self.listing.item_name,
+                self.listing.item_description,
+                self.listing.item_category,
+            )
+        return self._text
+
+    @property
+    def tokens(self) -> Set[str]:
+        if self._tokens is None:
+            self._tokens = tokenize(self.text)
+        return self._tokens
+
+    @property
+    def embedding(self) -> np.ndarray:
+        if self._embedding is None:
+            from semantic_search import get_semantic_matcher
+            self._embedding = get_semantic_matcher().get_embedding(self.text)
+        return self._embedding
+
+
+class CandidatePool:
+    """Candidate listings of one side, prepared once and scored many times."""
+
+    def __init__(self, side: str, items: List[PreparedListing], indexed: bool = False,
+                 ann_index: Optional[IVFIndex] = None, ann_pending: Optional[Set[int]] = None,
+                 resident: bool = False):
+        self.side = side
+        self.items = items
+        # Spatial/token indexes only pay off for pools queried more than once
+        # (batch, resident store); one-shot pools are scanned directly
+        self.indexed = indexed
+        # Resident store pool (token prefilter on by default) vs request-built
+        self.resident = resident
+        # Embedding index kept by the resident store across pool rebuilds;
+        # detached (None) once the store has moved on to a newer pool.
+        # `ann_pending` (the store's set) holds ids not embedded and indexed yet
+        self.ann_index = ann_index
+        self.ann_pending = ann_pending if ann_pending is not None else set()
+        self._listing_ids: Optional[np.ndarray] = None
+        self._id_order: Optional[np.ndarray] = None
+        self._sorted_ids: Optional[np.ndarray] = None
+        self._latitudes: Optional[np.ndarray] = None
+        self._longitudes: Optional[np.ndarray] = None
+        self._org_ids: Optional[np.ndarray] = None
+        self._prices: Optional[np.ndarray] = None
+        self._quantities: Optional[np.ndarray] = None
+        self._unit_classes: Optional[np.ndarray] = None
+        self._spatial_index: Optional[GridIndex] = None
+        self._token_index: Optional[TokenIndex] = None
+
+    @classmethod
+    def from_candidates(cls, candidates, side: str, indexed: bool = False) -> "CandidatePool":
+        """Build a pool from request candidates ({demand|supply, org} pairs)."""
+        return cls(side, [
+            PreparedListing(getattr(c, side), c.org, side)
+            for c in candidates
+        ], indexed=indexed)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _build_org_columns(self):
+        orgs = [c.org for c in self.items]
+        self._latitudes = np.array([o.latitude for o in orgs], dtype=np.float64)
+        self._longitudes = np.array([o.longitude for o in orgs], dtype=np.float64)
+        self._org_ids = np.array([o.org_id for o in orgs], dtype=np.int64)
+
+    @property
+    def latitudes(self) -> np.ndarray:
+        if self._latitudes is None:
+            self._build_org_columns()
+        return self._latitudes
+
+    @property
+    def longitudes(self) -> np.ndarray:
+        if self._longitudes is None:
+            self._build_org_columns()
+        return self._longitudes
+
+    @property
+    def org_ids(self) -> np.ndarray:
+        if self._org_ids is None:
+            self._build_org_columns()
+        return self._org_ids
+
+    def _build_listing_columns(self):
+        self._prices = np.array(
+            [np.nan if c.price is None else c.price for c in self.items], dtype=np.float64
+        )
+        self._quantities = np.array([c.normalized_quantity for c in self.items], dtype=np.float64)
+        self._unit_classes = np.array([c.unit_class for c in self.items], dtype=np.int64)
+
+    @property
+    def prices(self) -> np.ndarray:
+        """Asking prices (supply pool) or budgets (demand pool); NaN when missing."""
+        if self._prices is None:
+            self._build_listing_columns()
+        return self._prices
+
+    @property
+    def quantities(self) -> np.ndarray:
+        if self._quantities is None:
+            self._build_listing_columns()
+        return self._quantities
+
+    @property
+    def unit_classes(self) -> np.ndarray:
+        if self._unit_classes is None:
+            self._build_listing_columns()
+        return self._unit_classes
+
+    @property
+    def listing_ids(self) -> np.ndarray:
+        if self._listing_ids is None:
+            self._listing_ids = np.array([c.listing_id for c in self.items], dtype=np.int64)
+        return self._listing_ids
+
+    def positions_of(self, listing_ids: np.ndarray) -> np.ndarray:
+        """Pool positions of the given listing ids; -1 for ids not in the pool."""
+        if not len(self.items):
+            return np.full(len(listing_ids), -1, dtype=np.int64)
+        if self._id_order is None:
+            self._id_order = np.argsort(self.listing_ids, kind="stable")
+            self._sorted_ids = self.listing_ids[self._id_order]
+        at = np.minimum(np.searchsorted(self._sorted_ids, listing_ids), len(self.items) - 1)
+        return np.where(self._sorted_ids[at] == listing_ids, self._id_order[at], -1)
+
+    def ann_missing(self) -> List[PreparedListing]:
+        """Listings still pending for the ANN index."""
+        if self.ann_index is None or not self.ann_pending:
+            return []
+        positions = self.positions_of(np.fromiter(self.ann_pending, dtype=np.int64, count=len(self.ann_pending)))
+        return [self.items[i] for i in positions[positions >= 0].tolist()]
+
+    def add_to_ann_index(self, items: List[PreparedListing], complete: bool = True):
+        """
+        Index the (warmed) embeddings of `items`. Unless `complete` is False
+        (a fetch failed), they are no longer pending: texts with no embedding
+        (empty, stopwords only) stay out of the index for good.
+        """
+        if self.ann_index is None:
+            return
+        embedded = [item for item in items if item._embedding is not None and item._embedding.any()]
+        self.ann_index.add([item.listing_id for item in embedded], [item._embedding for item in embedded])
+        if complete:
+            self.ann_pending.difference_update(item.listing_id for item in items)
+
+    @property
+    def spatial_index(self) -> Optional[GridIndex]:
+        """Grid index over candidate coordinates; None when disabled or the pool is small."""
+        if not self.indexed or len(self) < settings.SPATIAL_INDEX_MIN_CANDIDATES:
+            return None
+        if self._spatial_index is None:
+            self._spatial_index = GridIndex(
+                self.latitudes, self.longitudes, settings.SPATIAL_INDEX_CELL_DEG
+            )
+        return self._spatial_index
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      exclude_org_id: Optional[int] = None):
+        """
+        Indices (in pool order) of the candidates inside the radius, and
+        their distances. Large pools only check candidates in grid cells
+        touching the search circle; others are scanned in one vectorized pass.
+        """
+        index = self.spatial_index
+        if index is not None:
+            idx = index.query(latitude, longitude, radius_km)
+            lats, lons = self.latitudes[idx], self.longitudes[idx]
+        else:
+            idx = None
+            lats, lons = self.latitudes, self.longitudes
+
+        distances = calculate_distances(latitude, longitude, lats, lons)
+        mask = distances <= radius_km
+        if exclude_org_id is not None:
+            org_ids = self.org_ids if idx is None else self.org_ids[idx]
+            mask &= org_ids != exclude_org_id
+
+        keep = np.flatnonzero(mask)
+        if idx is not None:
+            return idx[keep], distances[keep]
+        return keep, distances[keep]
+
+    @property
+    def token_index(self) -> Optional[TokenIndex]:
+        """Inverted token/category index; None for one-shot pools."""
+        if not self.indexed:
+            return None
+        if self._token_index is None:
+            self._token_index = TokenIndex.from_items(self.items)
+        return self._token_index
+
+    def shares_terms(self, source: PreparedListing, positions: np.ndarray) -> np.ndarray:
+        """
+        Boolean mask over `positions`: candidates sharing at least one
+        canonical token or a compatible category with the source.
+        """
+        listing = source.listing
+        index = self.token_index
+        if index is not None:
+            hits = index.lookup(source.tokens, listing.category_id, listing.item_category)
+            return np.isin(positions, hits)
+
+        source_tokens = source.tokens
+        mask = np.zeros(len(positions), dtype=bool)
+        for i, pos in enumerate(positions.tolist()):
+            cand = self.items[pos]
+            mask[i] = bool(source_tokens & cand.tokens) or check_category_match(
+                listing.category_id, cand.listing.category_id,
+                listing.item_category, cand.listing.item_category
+            )
+        return mask
+
+    def shares_category(self, source: PreparedListing, positions: np.ndarray) -> np.ndarray:
+        """Boolean mask over `positions`: candidates with a compatible category."""
+        listing = source.listing
+        index = self.token_index
+        if index is not None:
+            return np.isin(positions, index.category_lookup(listing.category_id, listing.item_category))
+
+        return np.array([
+            check_category_match(
+                listing.category_id, self.items[pos].listing.category_id,
+                listing.item_category, self.items[pos].listing.item_category
+            )
+            for pos in positions.tolist()
+        ], dtype=bool)
+
+
+# ═══════════════════════════════════════════════════════════════
+# Scoring
+# ═══════════════════════════════════════════════════════════════
+
+def warm_embeddings(items: List[PreparedListing]):
+    """
+    Fetch embeddings for every listing that does not have one yet, through
+    the matcher's batch API (one call per chunk of cache misses). Zero
+    vectors left by a failed fetch are retried on the next warm-up.
+    """
+    missing = _missing_embeddings(items)
+    if not missing:
+        return
+
+    from semantic_search import get_semantic_matcher
+    vectors = get_semantic_matcher().get_embeddings([item.text for item in missing])
+    for item, vec in zip(missing, vectors):
+        item._embedding = vec
+
+
+async def awarm_embeddings(items: List[PreparedListing]):
+    """Async warm_embeddings: fetches without blocking the event loop."""
+    missing = _missing_embeddings(items)
+    if not missing:
+        return
+
+    from semantic_search import get_semantic_matcher
+    vectors = await get_semantic_matcher().aget_embeddings([item.text for item in missing])
+    for item, vec in zip(missing, vectors):
+        item._embedding = vec
+
+
+def _embedding_fallback(message: str, error: Exception):
+    """Log a failed embedding step; the results being computed are degraded."""
+    from semantic_search import mark_degraded
+    print(f"[Worker] {message}: {error}")
+    mark_degraded()
+
+
+def _missing_embeddings(items: List[PreparedListing]) -> List[PreparedListing]:
+    return [item for item in items if item._embedding is None or not item._embedding.any()]
+
+
+def _semantic_scores(source: PreparedListing, items: List[PreparedListing]) -> Tuple[List[float], List[bool]]:
+    """
+    Cosine of the source embedding with every item's, as one matrix-vector
+    product over the stacked (unit-length) item embeddings, plus whether
+    both sides of each pair have a real, non-zero embedding.
+    """
+    from semantic_search import get_semantic_matcher
+    query = source.embedding
+    matrix = np.zeros((len(items), len(query)), dtype=np.float32)
+    for row, item in enumerate(items):
+        vec = item.embedding
+        # A failed fetch may leave a zero vector of another size; its row stays zero
+        if len(vec) == len(query):
+            matrix[row] = vec
+
+    scores = get_semantic_matcher().cosine_similarities(query, matrix)
+    embedded = matrix.any(axis=1) if query.any() else np.zeros(len(items), dtype=bool)
+    return scores.tolist(), embedded.tolist()
+
+
+def _pair_similarity(
+    source: PreparedListing,
+    cand: PreparedListing,
+    semantic_sim: Optional[float] = None,
+    embedded: bool = True,
+) -> float:
+    """
+    Hybrid similarity using the cached text and tokens and the semantic
+    score from _semantic_scores, memoized per text pair (either direction)
+    in the similarity cache. Always computed with the two texts in sorted
+    order, so the value does not depend on the match direction.
+    """
+    cache = get_similarity_cache()
+    if cache is not None:
+        key = cache.key(source.text, cand.text)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    # A failed fetch leaves a zero vector; don't keep the degraded score
+    cacheable = cache is not None and (embedded or not settings.USE_SEMANTIC_SEARCH)
+
+    first, second = ordered_pair(source, cand, text=attrgetter("text"))
+    value = calculate_hybrid_similarity(
+        first.text,
+        second.text,
+        use_semantic=settings.USE_SEMANTIC_SEARCH,
+        semantic_weight=settings.SEMANTIC_WEIGHT,
+        fuzzy_weight=settings.FUZZY_WEIGHT,
+        tokens1=first.tokens,
+        tokens2=second.tokens,
+        semantic_sim=semantic_sim,
+    )
+    if cacheable:
+        cache.put(key, value)
+    return value
+
+
+def _build_result(
+    cand: PreparedListing,
+    distance_km: float,
+    effective_sim: float,
+    score_detail: Dict[str, Any],
+    cat_match: bool,
+) -> Dict[str, Any]:
+    """Flatten a scored candidate into the MatchResult field layout."""
+    listing = cand.listing
+    org = cand.org
+    return {
+        "id": cand.listing_id,
+        "org_id": org.org_id,
+        "org_name": org.org_name,
+        "item_name": listing.item_name,
+        "item_category": listing.item_category,
+        "item_description": listing.item_description,
+        "price": cand.price,
+        "currency": listing.currency,
+        "quantity": listing.quantity,
+        "quantity_unit": listing.quantity_unit,
+        "distance_km": round(distance_km, 2),
+        "name_similarity": round(effective_sim, 3),
+        "match_score": round(score_detail["match_score"], 3),
+        "score_breakdown": score_detail["breakdown"],
+        "match_labels": score_detail["labels"],
+        "category_matched": cat_match,
+        "org_email": org.email,
+        "org_phone": org.phone_number,
+        "org_address": org.address,
+        "org_latitude": org.latitude,
+        "org_longitude": org.longitude,
+    }
+
+
+def _select_candidates(
+    source: PreparedListing,
+    pool: CandidatePool,
+    search_radius: float,
+    exclude_org_id: Optional[int],
+    full_scan: bool,
+):
+    """
+    Positions and distances of the candidates worth scoring: inside the
+    radius and, unless full_scan is set, sharing a token or category with
+    the source (TOKEN_INDEX_PREFILTER for the resident store,
+    TOKEN_INDEX_PREFILTER_REQUESTS for request-built pools).
+    """
+    # Distance prefilter: only in-radius candidates reach similarity/scoring
+    with metrics.stage_timer("distance_filter"):
+        in_radius, distances = pool.within_radius(
+            source.org.latitude, source.org.longitude, search_radius, exclude_org_id
+        )
+    metrics.count_considered(len(pool))
+    metrics.count_dropped("radius", len(pool) - len(in_radius))
+
+    prefilter = settings.TOKEN_INDEX_PREFILTER if pool.resident else settings.TOKEN_INDEX_PREFILTER_REQUESTS
+    if prefilter and not full_scan and len(in_radius):
+        metrics.count_reaching("token_prefilter", len(in_radius))
+        with metrics.stage_timer("token_prefilter"):
+            keep = pool.shares_terms(source, in_radius)
+        metrics.count_dropped("token_prefilter", len(in_radius) - int(keep.sum()))
+        in_radius, distances = in_radius[keep], distances[keep]
+
+    return in_radius, distances
+
+
+def _uses_ann(pool: CandidatePool, in_radius: np.ndarray, full_scan: bool) -> bool:
+    """Whether to shortlist by the pool's ANN index (large in-radius sets, semantic mode)."""
+    return (
+        pool.ann_index is not None
+        and settings.USE_SEMANTIC_SEARCH
+        and not full_scan
+        and len(in_radius) >= settings.ANN_MIN_CANDIDATES
+    )
+
+
+# Least effective similarity of a category match: max(sim, 0.65) + 0.15
+CATEGORY_MATCH_FLOOR = 0.8
+
+
+def _ann_shortlist(source: PreparedListing, pool: CandidatePool, in_radius: np.ndarray,
+                   distances: np.ndarray, search_radius: float, limit: Optional[int]):
+    """
+    The ANN_CANDIDATES in-radius candidates nearest to the source by
+    embedding (approximately, probing ANN_N_PROBE lists of the pool's
+    index), plus the in-radius candidates with a compatible category that
+    could make the top `limit`, in their original order. Distance, price
+    and quantity are then scored on the shortlist alone.
+
+    A category match scores at least its score at CATEGORY_MATCH_FLOOR
+    similarity, whatever its embedding, so one whose best possible score is
+    below the `limit`-th of those floors can never be returned.
+    """
+    query = source.embedding
+    if pool.ann_index is None or not query.any():
+        return in_radius, distances
+
+    metrics.count_reaching("ann", len(in_radius))
+    with metrics.stage_timer("ann"):
+        inside = np.zeros(len(pool), dtype=bool)
+        inside[in_radius] = True
+
+        def allowed(ids: np.ndarray) -> np.ndarray:
+            positions = pool.positions_of(ids)
+            return (positions >= 0) & inside[positions]
+
+        ids, _ = pool.ann_index.search(query, settings.ANN_CANDIDATES, settings.ANN_N_PROBE, allowed)
+        chosen = np.zeros(len(pool), dtype=bool)
+        chosen[pool.positions_of(ids)] = True
+        same_category = pool.shares_category(source, in_radius)
+        category_positions = np.flatnonzero(same_category)
+        if limit is not None and len(category_positions) > limit:
+            context = _context_columns(source, pool, in_radius[category_positions],
+                                       distances[category_positions], search_radius)
+            floors = match_score_upper_bound_columnar(context, CATEGORY_MATCH_FLOOR)
+            cutoff = np.partition(floors, -limit)[-limit]
+            same_category[category_positions[match_score_upper_bound_columnar(context) < cutoff]] = False
+        keep = chosen[in_radius] | same_category
+    metrics.count_dropped("ann", len(in_radius) - int(keep.sum()))
+    return in_radius[keep], distances[keep]
+
+
+def _candidate_steps(
+    source: PreparedListing,
+    pool: CandidatePool,
+    search_radius: float,
+    limit: Optional[int],
+    exclude_org_id: Optional[int],
+    full_scan: bool,
+) -> Generator[List[PreparedListing], Tuple[bool, Optional[Exception]], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Candidate selection shared by score_candidates and score_candidates_async:
+    radius and token prefilter, then the ANN shortlist. A generator, so the
+    embedding fetches stay with the caller: it yields each list of listings
+    whose embeddings must be warm, is sent back (degraded, error) from that
+    warm-up (_warm / _awarm), and returns (in_radius, distances) to score.
+    """
+    in_radius, distances = _select_candidates(source, pool, search_radius, exclude_org_id, full_scan)
+
+    if _uses_ann(pool, in_radius, full_scan):
+        try:
+            missing = pool.ann_missing()
+            degraded, error = yield [source] + missing
+            if error is not None:
+                raise error
+            pool.add_to_ann_index(missing, complete=not degraded)
+            in_radius, distances = _ann_shortlist(source, pool, in_radius, distances,
+                                                  search_radius, limit)
+        except Exception as e:
+            print(f"[Worker] ANN shortlist failed: {e}")
+
+    if settings.USE_SEMANTIC_SEARCH:
+        _, error = yield [source] + [pool.items[i] for i in in_radius.tolist()]
+        if error is not None:
+            _embedding_fallback("Embedding warm-up failed", error)
+
+    return in_radius, distances
+
+
+def _warm(items: List[PreparedListing]) -> Tuple[bool, Optional[Exception]]:
+    """Run one warm-up for _candidate_steps: (any fetch fell back, error raised)."""
+    from semantic_search import fallback_scope
+    try:
+        with metrics.stage_timer("embeddings"), fallback_scope() as fetch:
+            warm_embeddings(items)
+    except Exception as e:
+        return True, e
+    return fetch["degraded"], None
+
+
+async def _awarm(items: List[PreparedListing]) -> Tuple[bool, Optional[Exception]]:
+    """_warm through the async client."""
+    from semantic_search import fallback_scope
+    try:
+        with metrics.stage_timer("embeddings"), fallback_scope() as fetch:
+            await awarm_embeddings(items)
+    except Exception as e:
+        return True, e
+    return fetch["degraded"], None
+
+
+def score_candidates(
+    source: PreparedListing,
+    pool: CandidatePool,
+    search_radius: float,
+    limit: Optional[int] = None,
+    exclude_org_id: Optional[int] = None,
+    full_scan: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Score every candidate in the pool against one source listing.
+    `full_scan` skips the token/category shortlist (for recall checks).
+
+    Returns result dicts (MatchResult layout) sorted by match score,
+    truncated to `limit` when given.
+    """
+    if len(pool) == 0:
+        return []
+
+    steps = _candidate_steps(source, pool, search_radius, limit, exclude_org_id, full_scan)
+    outcome = None
+    while True:
+        try:
+            items = steps.send(outcome)
+        except StopIteration as done:
+            in_radius, distances = done.value
+            break
+        outcome = _warm(items)
+
+    return _score_in_radius(source, pool, in_radius, distances, search_radius, limit)
+
+
+async def score_candidates_async(
+    source: PreparedListing,
+    pool: CandidatePool,
+    search_radius: float,
+    limit: Optional[int] = None,
+    exclude_org_id: Optional[int] = None,
+    full_scan: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Same as score_candidates, but embeddings are awaited through the async
+    client so other requests keep running while this one waits on the API.
+    """
+    if len(pool) == 0:
+        return []
+
+    steps = _candidate_steps(source, pool, search_radius, limit, exclude_org_id, full_scan)
+    outcome = None
+    while True:
+        try:
+            items = steps.send(outcome)
+        except StopIteration as done:
+            in_radius, distances = done.value
+            break
+        outcome = await _awarm(items)
+
+    executor = get_scoring_executor()
+    if executor is not None and len(in_radius) >= settings.SCORING_PARALLEL_MIN_CANDIDATES:
+        return await _score_in_processes(executor, source, pool, in_radius, distances, search_radius, limit)
+
+    return _score_in_radius(source, pool, in_radius, distances, search_radius, limit)
+
+
+async def iter_scored_chunks(
+    source: PreparedListing,
+    pool: CandidatePool,
+    search_radius: float,
+    exclude_org_id: Optional[int] = None,
+    full_scan: bool = False,
+    chunk_size: Optional[int] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Uncapped scoring for streaming: yields the results of each chunk of
+    in-radius candidates (pool order, ranked within the chunk) as soon as
+    it is scored. Embeddings are warmed per chunk and, for request-built
+    pools, dropped again once the chunk is scored, so at most one chunk's
+    vectors are held at a time. The resident store keeps its embeddings.
+    """
+    if len(pool) == 0:
+        return
+
+    in_radius, distances = _select_candidates(source, pool, search_radius, exclude_org_id, full_scan)
+    chunk_size = chunk_size or settings.SCORING_CHUNK_SIZE
+
+    for start in range(0, len(in_radius), chunk_size):
+        idx = in_radius[start:start + chunk_size]
+        dist = distances[start:start + chunk_size]
+
+        if settings.USE_SEMANTIC_SEARCH:
+            try:
+                with metrics.stage_timer("embeddings"):
+                    await awarm_embeddings([source] + [pool.items[i] for i in idx.tolist()])
+            except Exception as e:
+                _embedding_fallback("Embedding warm-up failed", e)
+
+        rows = _score_in_radius(source, pool, idx, dist, search_radius, None)
+        if not pool.resident:
+            for i in idx.tolist():
+                pool.items[i]._embedding = None
+        yield rows
+        # Let other requests run between chunks
+        await asyncio.sleep(0)
+
+
+def _context_columns(
+    source: PreparedListing,
+    pool: CandidatePool,
+    in_radius: np.ndarray,
+    distances: np.ndarray,
+    search_radius: float,
+) -> Dict[str, np.ndarray]:
+    """Distance, price and quantity scores of all in-radius candidates at once."""
+    source_price = np.nan if source.price is None else source.price
+    cand_prices = pool.prices[in_radius]
+    cand_qty = pool.quantities[in_radius]
+    cand_units = pool.unit_classes[in_radius]
+
+    if source.side == "supply":
+        supply_cols = (source_price, source.normalized_quantity, source.unit_class)
+        demand_cols = (cand_prices, cand_qty, cand_units)
+    else:
+        supply_cols = (cand_prices, cand_qty, cand_units)
+        demand_cols = (source_price, source.normalized_quantity, source.unit_class)
+
+    return calculate_context_scores_columnar(
+        distance_km=distances,
+        supply_price=supply_cols[0],
+        demand_max_price=demand_cols[0],
+        max_distance=search_radius,
+        supply_qty=supply_cols[1],
+        supply_unit_class=supply_cols[2],
+        demand_qty=demand_cols[1],
+        demand_unit_class=demand_cols[2],
+        price_tolerance=settings.PRICE_TOLERANCE_PERCENT,
+    )
+
+
+def _row_context(context: Dict[str, np.ndarray], pos: int) -> Dict[str, Any]:
+    """One candidate's entry of a columnar context, as calculate_context_scores returns it."""
+    fulfillment_pct = context["fulfillment_pct"][pos]
+    return {
+        "distance": float(context["distance"][pos]),
+        "price": float(context["price"][pos]),
+        "quantity": float(context["quantity"][pos]),
+        "price_label": PRICE_LABELS[context["price_label"][pos]],
+        "quantity_label": QUANTITY_LABELS[context["quantity_label"][pos]],
+        "fulfillment_pct": None if np.isnan(fulfillment_pct) else float(fulfillment_pct),
+    }
+
+
+def _score_in_radius(
+    source: PreparedListing,
+    pool: CandidatePool,
+    in_radius: np.ndarray,
+    distances: np.ndarray,
+    search_radius: float,
+    limit: Optional[int],
+    semantic: Optional[Tuple[List[float], List[bool]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Similarity + scoring for the in-radius candidates (embeddings already warm).
+    `semantic` holds precomputed _semantic_scores for all of `in_radius`;
+    without it they are computed here from the candidates' embeddings.
+
+    Distance, price and quantity are scored first; they bound the final
+    score, so the similarity step is skipped for candidates that could not
+    reach MIN_MATCH_SCORE or beat the current K-th best. Ranking uses the
+    lean numeric score only; breakdowns, labels and result dicts are built
+    for the returned rows. The ranking equals a stable sort by match_score
+    of every candidate.
+    """
+    if limit is not None and limit <= 0:
+        return []
+
+    # (match_score, -position, (position, effective_sim, cat_match)): the
+    # heap root is the entry a new, later candidate has to beat — ties go
+    # to the earlier one
+    heap = []
+    scored = []
+    started = time.perf_counter()
+    pair_cache = get_similarity_cache()
+    cache_counts = (pair_cache.hits, pair_cache.misses) if pair_cache is not None else None
+    similarity_seconds = 0.0
+    below_threshold = 0
+    pruned = 0
+
+    context = _context_columns(source, pool, in_radius, distances, search_radius)
+    bounds = match_score_upper_bound_columnar(context)
+    reachable = np.flatnonzero(bounds >= MIN_MATCH_SCORE)
+    below_min_score = len(in_radius) - len(reachable)
+
+    positions = in_radius.tolist()
+    bound_list = bounds.tolist()
+    dist_scores = context["distance"].tolist()
+    price_scores = context["price"].tolist()
+    qty_scores = context["quantity"].tolist()
+
+    # Semantic scores of every reachable candidate in one product
+    semantic_scores = embedded = None
+    if settings.USE_SEMANTIC_SEARCH and semantic is not None:
+        semantic_scores = [semantic[0][pos] for pos in reachable.tolist()]
+        embedded = [semantic[1][pos] for pos in reachable.tolist()]
+    elif settings.USE_SEMANTIC_SEARCH and len(reachable):
+        sim_started = time.perf_counter()
+        try:
+            semantic_scores, embedded = _semantic_scores(
+                source, [pool.items[positions[pos]] for pos in reachable.tolist()]
+            )
+        except Exception as e:
+            _embedding_fallback("Semantic scoring failed", e)
+            semantic_scores, embedded = [0.0] * len(reachable), [False] * len(reachable)
+        similarity_seconds += time.perf_counter() - sim_started
+
+    # Phase 1: lean scores and the top K
+    for rank, pos in enumerate(reachable.tolist()):
+        cand = pool.items[positions[pos]]
+
+        try:
+            if limit is not None and len(heap) >= limit and bound_list[pos] <= heap[0][0]:
+                pruned += 1
+                continue
+
+            sim_started = time.perf_counter()
+
+            # Category match (consistent logic)
+            cat_match = check_category_match(
+                source.listing.category_id, cand.listing.category_id,
+                source.listing.item_category, cand.listing.item_category
+            )
+
+            # Hybrid similarity
+            try:
+                if semantic_scores is None:
+                    name_similarity = _pair_similarity(source, cand)
+                else:
+                    name_similarity = _pair_similarity(source, cand, semantic_scores[rank], embedded[rank])
+            except Exception as e:
+                print(f"[Worker] Similarity calc failed: {e}")
+                name_similarity = 0.0
+
+            similarity_seconds += time.perf_counter() - sim_started
+
+            # Skip only if NEITHER category nor name matches
+            if not cat_match and name_similarity < settings.SIMILARITY_THRESHOLD:
+                below_threshold += 1
+                continue
+
+            # Category boost: moderate, not overwhelming
+            if cat_match:
+                effective_sim = max(name_similarity, 0.65)
+                # Additional boost proportional to name similarity
+                effective_sim = min(1.0, effective_sim + 0.15)
+            else:
+                effective_sim = name_similarity
+
+            score = lean_match_score(effective_sim, dist_scores[pos], price_scores[pos], qty_scores[pos])
+            if score < MIN_MATCH_SCORE:
+                below_min_score += 1
+                continue
+
+            entry = (score, -pos, (pos, effective_sim, cat_match))
+            if limit is None:
+                scored.append(entry)
+            elif len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+        except Exception as item_err:
+            print(f"[Worker] Skipping candidate due to error: {item_err}")
+            continue
+
+    sort_started = time.perf_counter()
+    ranked = scored if limit is None else heap
+    ranked.sort(key=lambda entry: (-entry[0], -entry[1]))
+    sort_seconds = time.perf_counter() - sort_started
+
+    # Phase 2: explanations for the returned rows only
+    results = []
+    for _, _, (pos, effective_sim, cat_match) in ranked:
+        score_detail = build_match_score_detail(effective_sim, _row_context(context, pos))
+        results.append(_build_result(
+            pool.items[positions[pos]], float(distances[pos]), effective_sim, score_detail, cat_match
+        ))
+
+    metrics.observe_stage("similarity", similarity_seconds)
+    metrics.observe_stage("sort", sort_seconds)
+    metrics.observe_stage("scoring", time.perf_counter() - started - similarity_seconds - sort_seconds)
+    metrics.count_dropped("similarity_threshold", below_threshold)
+    metrics.count_dropped("min_match_score", below_min_score)
+    metrics.count_dropped("top_k", pruned)
+    if cache_counts is not None:
+        metrics.count_similarity_cache(pair_cache.hits - cache_counts[0], pair_cache.misses - cache_counts[1])
+    metrics.count_reaching("similarity", len(reachable) - pruned)
+    metrics.count_reaching("scoring", len(reachable) - pruned - below_threshold)
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# Process-Pool Scoring
+# ═══════════════════════════════════════════════════════════════
+
+_scoring_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_scoring_executor() -> Optional[ProcessPoolExecutor]:
+    """Shared scoring process pool; None when SCORING_WORKERS is 0."""
+    global _scoring_executor
+    if settings.SCORING_WORKERS <= 0:
+        return None
+    if _scoring_executor is None:
+        # spawn: children must not inherit the event loop, threads or sqlite handles
+        _scoring_executor = ProcessPoolExecutor(
+            max_workers=settings.SCORING_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _scoring_executor
+
+
+def shutdown_scoring_executor():
+    global _scoring_executor
+    if _scoring_executor is not None:
+        _scoring_executor.shutdown(wait=False, cancel_futures=True)
+        _scoring_executor = None
+
+
+def score_chunk(
+    source: PreparedListing,
+    items: List[PreparedListing],
+    distances: List[float],
+    search_radius: float,
+    limit: Optional[int],
+    semantic: Optional[Tuple[List[float], List[bool]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Worker-process entry point: score one chunk of in-radius candidates.
+    Semantic scores are computed by the parent and passed in, so the child
+    never reads embeddings and never calls the embedding API.
+    """
+    if settings.USE_SEMANTIC_SEARCH and semantic is None:
+        raise ValueError("score_chunk needs precomputed semantic scores in semantic mode")
+    chunk_pool = CandidatePool("demand" if source.side == "supply" else "supply", items)
+    return _score_in_radius(
+        source, chunk_pool, np.arange(len(items)), np.asarray(distances), search_radius, limit,
+        semantic,
+    )
+
+
+async def _score_in_processes(
+    executor: ProcessPoolExecutor,
+    source: PreparedListing,
+    pool: CandidatePool,
+    in_radius: np.ndarray,
+    distances: np.ndarray,
+    search_radius: float,
+    limit: Optional[int],
+) -> List[Dict[str, Any]]:
+    """
+    Split the in-radius candidates into contiguous chunks, score them in the
+    process pool and merge the per-chunk top-K lists.
+    """
+    n = len(in_radius)
+    chunk_size = max(1, min(settings.SCORING_CHUNK_SIZE, math.ceil(n / settings.SCORING_WORKERS)))
+    loop = asyncio.get_running_loop()
+
+    # One product here; children get their slice instead of embeddings
+    scores = embedded = None
+    if settings.USE_SEMANTIC_SEARCH:
+        with metrics.stage_timer("similarity"):
+            try:
+                scores, embedded = _semantic_scores(source, [pool.items[i] for i in in_radius.tolist()])
+            except Exception as e:
+                _embedding_fallback("Semantic scoring failed", e)
+                scores, embedded = [0.0] * n, [False] * n
+
+    futures = []
+    for start in range(0, n, chunk_size):
+        end = start + chunk_size
+        idx = in_radius[start:end].tolist()
+        futures.append(loop.run_in_executor(
+            executor, score_chunk,
+            source, [pool.items[i] for i in idx],
+            distances[start:end].tolist(),
+            search_radius, limit,
+            (scores[start:end], embedded[start:end]) if scores is not None else None,
+        ))
+
+    # Chunks are contiguous and each is stably sorted, so concatenating in
+    # chunk order and re-sorting stably keeps the single-process tie order.
+    results = []
+    for rows in await asyncio.gather(*futures):
+        results.extend(rows)
+
+    results.sort(key=lambda r: r["match_score"], reverse=True)
+    if limit is not None:
+        results = results[:limit]
+    return results
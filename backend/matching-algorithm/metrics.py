@@ -0,0 +1,207 @@
+"""
+Prometheus Metrics
+
+Counters and histograms for the matching worker, exposed on /metrics:
+request counts and pool sizes per endpoint, latency per pipeline stage,
+how many candidates each filter drops, and embedding cache / API
+behaviour. Stages are recorded by the code that runs them; request
+parsing is timed from the ASGI middleware to the start of the handler.
+Every hook also feeds the request's profile when profiling is on
+(profiling.py).
+
+Scoring done in worker processes (SCORING_WORKERS > 0) is recorded in
+those processes' registries, so per-stage times for such requests only
+cover the parent's share.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+from profiling import current_profile
+
+_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+REQUESTS = Counter(
+    "matching_requests_total", "HTTP requests handled by the worker",
+    ["endpoint", "status"],
+)
+REQUEST_CANDIDATES = Histogram(
+    "matching_request_candidates", "Candidate pool size per match request",
+    ["endpoint"],
+    buckets=(10, 100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000),
+)
+STAGE_SECONDS = Histogram(
+    "matching_stage_seconds",
+    "Time per pipeline stage: parse, distance_filter, token_prefilter, embeddings, "
+    "ann, similarity, scoring, sort, serialize",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+CANDIDATES_CONSIDERED = Counter(
+    "matching_candidates_considered_total", "Candidates entering the filter chain",
+)
+CANDIDATES_DROPPED = Counter(
+    "matching_candidates_dropped_total",
+    "Candidates removed per filter: radius (incl. own org), token_prefilter, "
+    "ann (outside the nearest-neighbour shortlist), similarity_threshold, "
+    "min_match_score, top_k (pruned by the score bound)",
+    ["filter"],
+)
+EMBEDDING_CACHE = Counter(
+    "matching_embedding_cache_total", "Embedding lookups per cache layer (memory, disk)",
+    ["layer", "result"],
+)
+EMBEDDING_API_SECONDS = Histogram(
+    "matching_embedding_api_seconds", "Latency of one embedding API call (one batch)",
+    ["provider"],
+    buckets=_LATENCY_BUCKETS,
+)
+SIMILARITY_CACHE = Counter(
+    "matching_similarity_cache_total", "Pairwise similarity cache lookups",
+    ["result"],
+)
+RESULT_CACHE = Counter(
+    "matching_result_cache_total", "Match result cache lookups (hit, miss, coalesced; "
+    "uncached = a miss scored with fallback embeddings, not stored; bypass = profiled request)",
+    ["result"],
+)
+EMBEDDING_API_ERRORS = Counter(
+    "matching_embedding_api_errors_total", "Embedding API calls that failed",
+    ["provider"],
+)
+
+_request_started: ContextVar[Optional[float]] = ContextVar("matching_request_started", default=None)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    profile = current_profile()
+    if profile is not None:
+        profile.add_stage(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def request_started() -> Optional[float]:
+    """perf_counter value at which the current request arrived, if known."""
+    return _request_started.get()
+
+
+def observe_parse():
+    """Record the time from request arrival to the start of the handler."""
+    started = request_started()
+    if started is not None:
+        observe_stage("parse", time.perf_counter() - started)
+
+
+def observe_candidates(endpoint: str, count: int):
+    REQUEST_CANDIDATES.labels(endpoint).observe(count)
+
+
+def count_considered(count: int):
+    if count:
+        CANDIDATES_CONSIDERED.inc(count)
+    count_reaching("distance_filter", count)
+
+
+def count_reaching(stage: str, count: int):
+    """Candidates entering a stage; only reported in request profiles."""
+    profile = current_profile()
+    if profile is not None:
+        profile.add_reaching(stage, count)
+
+
+def count_dropped(filter_name: str, count: int):
+    if count:
+        CANDIDATES_DROPPED.labels(filter_name).inc(count)
+    profile = current_profile()
+    if profile is not None:
+        profile.add_dropped(filter_name, count)
+
+
+def count_embedding_lookups(layer: str, hits: int, misses: int):
+    if hits:
+        EMBEDDING_CACHE.labels(layer, "hit").inc(hits)
+    if misses:
+        EMBEDDING_CACHE.labels(layer, "miss").inc(misses)
+    profile = current_profile()
+    if profile is not None and (hits or misses):
+        profile.add_embedding_lookups(layer, hits, misses)
+
+
+def observe_embedding_call(provider: str, seconds: float):
+    EMBEDDING_API_SECONDS.labels(provider).observe(seconds)
+    profile = current_profile()
+    if profile is not None:
+        profile.add_embedding_call(seconds)
+
+
+def count_embedding_error(provider: str):
+    EMBEDDING_API_ERRORS.labels(provider).inc()
+    profile = current_profile()
+    if profile is not None:
+        profile.add_embedding_error()
+
+
+def count_similarity_cache(hits: int, misses: int):
+    if hits:
+        SIMILARITY_CACHE.labels("hit").inc(hits)
+    if misses:
+        SIMILARITY_CACHE.labels("miss").inc(misses)
+    profile = current_profile()
+    if profile is not None:
+        profile.add_similarity_lookups(hits, misses)
+
+
+def count_result_cache(result: str):
+    RESULT_CACHE.labels(result).inc()
+    profile = current_profile()
+    if profile is not None:
+        profile.result_cache = result
+
+
+def render_metrics():
+    """Body and content type for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware: marks request arrival and counts responses per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        _request_started.set(time.perf_counter())
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUESTS.labels(endpoint, str(status_code)).inc()
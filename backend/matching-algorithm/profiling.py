@@ -0,0 +1,133 @@
+"""
+Per-request Profiling
+
+Opt-in breakdown of one match request, returned in its response: wall time
+per pipeline stage, candidates reaching each stage and dropped by each
+filter, embedding API calls and cache hits, and optionally a cProfile
+top-N. The numbers come from the same hooks that feed the Prometheus
+metrics (metrics.py), which forward them to the request's active profile.
+
+cProfile sees the whole process while it runs, so other requests awaited
+concurrently show up in the top-N too; only one request is profiled this
+way at a time, others get their breakdown without it.
+"""
+
+import cProfile
+import pstats
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("matching_request_profile", default=None)
+_cprofile_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Stage times and counters collected for one request."""
+
+    def __init__(self, top_n: int = 0, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.reaching: Dict[str, int] = {}
+        self.dropped: Dict[str, int] = {}
+        self.embedding_calls = 0
+        self.embedding_errors = 0
+        self.embedding_seconds = 0.0
+        self.embedding_cache: Dict[str, Dict[str, int]] = {}
+        self.similarity_cache = {"hits": 0, "misses": 0}
+        self.result_cache: Optional[str] = None
+        self.top_n = top_n
+        self._profiler: Optional[cProfile.Profile] = None
+        self._top: Optional[List[Dict[str, Any]]] = None
+
+        if top_n > 0 and _cprofile_lock.acquire(blocking=False):
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    # ── Hooks (called through metrics.py) ──
+
+    def add_stage(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_reaching(self, stage: str, count: int):
+        self.reaching[stage] = self.reaching.get(stage, 0) + count
+
+    def add_dropped(self, filter_name: str, count: int):
+        self.dropped[filter_name] = self.dropped.get(filter_name, 0) + count
+
+    def add_embedding_lookups(self, layer: str, hits: int, misses: int):
+        counts = self.embedding_cache.setdefault(layer, {"hits": 0, "misses": 0})
+        counts["hits"] += hits
+        counts["misses"] += misses
+
+    def add_similarity_lookups(self, hits: int, misses: int):
+        self.similarity_cache["hits"] += hits
+        self.similarity_cache["misses"] += misses
+
+    def add_embedding_call(self, seconds: float):
+        self.embedding_calls += 1
+        self.embedding_seconds += seconds
+
+    def add_embedding_error(self):
+        self.embedding_errors += 1
+
+    # ── Output ──
+
+    def stop(self):
+        """Stop cProfile (if running) and keep its top-N; safe to call twice."""
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        stats = pstats.Stats(self._profiler)
+        self._profiler = None
+        _cprofile_lock.release()
+
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        self._top = []
+        for func in stats.fcn_list[:self.top_n]:
+            _, calls, total, cumulative, _ = stats.stats[func]
+            filename, line, name = func
+            self._top.append({
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            })
+
+    def report(self) -> Dict[str, Any]:
+        self.stop()
+        report = {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages_ms": {stage: round(s * 1000, 3) for stage, s in self.stages.items()},
+            "candidates": dict(self.reaching),
+            "dropped": dict(self.dropped),
+            "embeddings": {
+                "api_calls": self.embedding_calls,
+                "api_errors": self.embedding_errors,
+                "api_ms": round(self.embedding_seconds * 1000, 3),
+                "cache": {layer: dict(counts) for layer, counts in self.embedding_cache.items()},
+            },
+            "similarity_cache": dict(self.similarity_cache),
+        }
+        if self.result_cache is not None:
+            # bypass: profiled requests always compute their own results
+            report["result_cache"] = self.result_cache
+        if self.top_n > 0:
+            # None: another request held the profiler
+            report["cprofile"] = self._top
+        return report
+
+
+def start_profile(top_n: int = 0, started: Optional[float] = None) -> RequestProfile:
+    """
+    Create a profile and make it the active one for the current request;
+    `started` (a perf_counter value) is when the request arrived.
+    """
+    profile = RequestProfile(top_n, started)
+    _active.set(profile)
+    return profile
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _active.get()
@@ -0,0 +1,200 @@
+"""
+Match Result Cache
+
+In-worker cache of computed match results, keyed by a fingerprint of the
+request content (raw body, plus the store version for resident pools)
+and of the settings that affect scoring. Entries expire after a TTL and
+are evicted least-recently-used beyond an entry count or a memory cap
+(measured as the results' serialized size).
+
+Identical requests that arrive while the first one is still computing
+wait for that computation instead of running their own (single-flight).
+Results computed while the embedding API was failing (zero-vector
+fallbacks) are returned but not stored, so an outage is not served from
+cache for a whole TTL.
+Candidate order is part of the key on purpose: ties are ranked by
+position, so a reordered pool may rank differently. Profiled requests
+bypass the cache, so their profile covers a real computation.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import orjson
+
+import metrics
+from config import get_settings
+from profiling import current_profile
+from semantic_search import fallback_scope
+
+settings = get_settings()
+
+# Settings that change scores or which results are returned
+SCORING_SETTINGS = (
+    "MAX_RESULTS", "SIMILARITY_THRESHOLD", "PRICE_TOLERANCE_PERCENT",
+    "TOKEN_INDEX_PREFILTER", "TOKEN_INDEX_PREFILTER_REQUESTS",
+    "USE_SEMANTIC_SEARCH", "SEMANTIC_PROVIDER", "SEMANTIC_WEIGHT", "FUZZY_WEIGHT",
+    "HF_MODEL", "OPENAI_MODEL", "LOCAL_EMBEDDING_DIM",
+    "ANN_INDEX", "ANN_MIN_CANDIDATES", "ANN_CANDIDATES", "ANN_LISTS", "ANN_N_PROBE",
+)
+
+
+def _settings_digest() -> bytes:
+    return orjson.dumps({name: getattr(settings, name) for name in SCORING_SETTINGS})
+
+
+def request_fingerprint(*parts: Union[bytes, str, int, float, None]) -> str:
+    """Stable key over the scoring settings and the given request parts."""
+    digest = hashlib.blake2b(digest_size=20)
+    for part in (_settings_digest(),) + parts:
+        data = part if isinstance(part, bytes) else str(part).encode()
+        # Length prefix, so part boundaries cannot shift
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU + TTL cache of match results with a byte cap and single-flight."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.uncached = 0
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, key: str, value: Any):
+        size = len(orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value for `key`, else the result of an identical request
+        already in flight, else compute() (and cache it). If the request
+        doing the work is cancelled, a waiting one takes over.
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                metrics.count_result_cache("hit")
+                return value
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                value = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if pending.cancelled():
+                    continue
+                raise
+            self.coalesced += 1
+            metrics.count_result_cache("coalesced")
+            return value
+
+        self.misses += 1
+        metrics.count_result_cache("miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            with fallback_scope() as fallback:
+                value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved when there are none
+            future.exception()
+            raise
+        else:
+            if fallback["degraded"]:
+                self.uncached += 1
+                metrics.count_result_cache("uncached")
+            else:
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "uncached": self.uncached,
+            "in_flight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+        }
+
+
+# Global instance
+_result_cache = None
+
+def get_result_cache() -> Optional[ResultCache]:
+    """The worker's result cache, or None when RESULT_CACHE_MAX_ENTRIES is 0."""
+    global _result_cache
+    if _result_cache is None and settings.RESULT_CACHE_MAX_ENTRIES > 0:
+        _result_cache = ResultCache(
+            settings.RESULT_CACHE_MAX_ENTRIES,
+            int(settings.RESULT_CACHE_MAX_MB * 1024 * 1024),
+            settings.RESULT_CACHE_TTL_SECONDS,
+        )
+    return _result_cache
+
+
+async def cached_results(key_parts: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    compute() through the result cache (or directly when it is disabled or
+    the request is being profiled).
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return await compute()
+    if current_profile() is not None:
+        metrics.count_result_cache("bypass")
+        return await compute()
+    return await cache.get_or_compute(request_fingerprint(*key_parts), compute)
@@ -2,20 +2,53 @@
 Main Algorithm 
 Semantic Search Module for Waste Exchange Matching
 
-This module uses External APIs (HuggingFace or OpenAI) or Fuzzy Matching 
-to understand semantic similarity.
+This module uses External APIs (HuggingFace or OpenAI), a local feature-hashing
+embedding, or Fuzzy Matching to understand semantic similarity.
 """
 
+import asyncio
+import httpx
 import requests
 import numpy as np
+import re
 import time
-from typing import List, Tuple, Optional
-from functools import lru_cache
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple, Optional
 from config import get_settings
+from embedding_cache import EmbeddingMemoryCache, open_embedding_cache
+import metrics
+from utils import tokenize, SYNONYM_MAP
 
 # Global settings
 settings = get_settings()
 
+# Fallback record of the computation in progress (see fallback_scope)
+_fallbacks: ContextVar[Tuple[Dict[str, bool], ...]] = ContextVar("embedding_fallbacks", default=())
+
+
+@contextmanager
+def fallback_scope():
+    """
+    Track whether any embedding in the block fell back to a zero vector
+    (failed fetch). Yields a dict whose "degraded" flag is set on the first
+    fallback; tasks and threads started inside the block share it. Scopes
+    nest: a fallback marks every enclosing scope too.
+    """
+    state = {"degraded": False}
+    token = _fallbacks.set(_fallbacks.get() + (state,))
+    try:
+        yield state
+    finally:
+        _fallbacks.reset(token)
+
+
+def mark_degraded():
+    """Record an embedding fallback in the active fallback_scopes, if any."""
+    for state in _fallbacks.get():
+        state["degraded"] = True
+
 class SemanticMatcher:
     """
     Handles semantic matching using API-based embeddings or lightweight fallback.
@@ -23,81 +56,272 @@ class SemanticMatcher:
     
     def __init__(self):
         self.provider = settings.SEMANTIC_PROVIDER
+        # Unit-length float32 vectors, per instance, bounded by bytes
+        self.memory_cache = EmbeddingMemoryCache(int(settings.EMBEDDING_MEMORY_CACHE_MB * 1024 * 1024))
+        # Keep-alive HTTP clients (sync path and async path)
+        self._session = requests.Session()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop = None
+        # On-disk cache shared by all worker processes (None when disabled)
+        self.disk_cache = None
+        if self.provider in ("openai", "huggingface"):
+            self.disk_cache = open_embedding_cache(settings.EMBEDDING_CACHE_PATH)
         print(f"Initializing SemanticMatcher with provider: {self.provider}")
-        
-    @lru_cache(maxsize=1000)
+    
+    @property
+    def model_name(self) -> str:
+        if self.provider == "openai":
+            return settings.OPENAI_MODEL
+        if self.provider == "huggingface":
+            return settings.HF_MODEL
+        return self.provider
+    
     def get_embedding(self, text: str) -> np.ndarray:
         """
         Get embedding for text from configured API.
         Cached to reduce API calls.
         """
-        if not text:
-            return np.zeros(384) # Default size for MiniLM
+        return self.get_embeddings([text])[0]
+    
+    def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Get embeddings for many texts. Memory misses are looked up in the
+        on-disk cache; the rest are de-duplicated and fetched in chunks of
+        EMBEDDING_BATCH_SIZE, one API call per chunk.
+        """
+        keys = [(t or "").lower().strip() for t in texts]
+        
+        if self.provider == "local":
+            return self._local_embeddings(keys)
+        
+        found = {}
+        if self.provider in ("openai", "huggingface"):
+            misses = self._collect_misses(keys, found)
+            if misses and self.disk_cache is not None:
+                misses = self._load_from_disk(misses, self.disk_cache.get_many(
+                    self.provider, self.model_name, misses), found)
+            
+            for chunk in self._chunks(misses):
+                try:
+                    vectors = self._fetch_embeddings(chunk)
+                except Exception as e:
+                    print(f"Error fetching embeddings ({self.provider}): {e}")
+                    metrics.count_embedding_error(self.provider)
+                    mark_degraded()
+                    continue
+                self._store_fetched(chunk, vectors, found)
+        
+        return self._assemble(keys, found)
+    
+    async def aget_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Async get_embeddings: chunks are fetched concurrently over a pooled
+        keep-alive client, and disk lookups run in a thread, so the event
+        loop is never blocked on embedding I/O.
+        """
+        keys = [(t or "").lower().strip() for t in texts]
+        
+        if self.provider == "local":
+            # Pure CPU, microseconds per text: nothing to await
+            return self._local_embeddings(keys)
+        
+        found = {}
+        if self.provider in ("openai", "huggingface"):
+            misses = self._collect_misses(keys, found)
+            if misses and self.disk_cache is not None:
+                stored = await asyncio.to_thread(
+                    self.disk_cache.get_many, self.provider, self.model_name, misses)
+                misses = self._load_from_disk(misses, stored, found)
             
-        text = text.lower().strip()
+            if misses:
+                semaphore = asyncio.Semaphore(max(1, settings.EMBEDDING_MAX_CONCURRENCY))
+                
+                async def fetch(chunk: List[str]):
+                    async with semaphore:
+                        try:
+                            vectors = await self._afetch_embeddings(chunk)
+                        except Exception as e:
+                            print(f"Error fetching embeddings ({self.provider}): {e}")
+                            metrics.count_embedding_error(self.provider)
+                            mark_degraded()
+                            return
+                    self._store_fetched(chunk, vectors, found, write_disk=False)
+                    if self.disk_cache is not None:
+                        await asyncio.to_thread(self.disk_cache.put_many, self.provider,
+                                                self.model_name, dict(zip(chunk, vectors)))
+                
+                await asyncio.gather(*(fetch(chunk) for chunk in self._chunks(misses)))
+        
+        return self._assemble(keys, found)
+    
+    def _collect_misses(self, keys: List[str], found: Dict[str, np.ndarray]) -> List[str]:
+        """Distinct non-empty keys missing from the memory cache, in order; hits go to `found`."""
+        misses = []
+        seen = set()
+        for key in keys:
+            if key and key not in seen:
+                seen.add(key)
+                vec = self.memory_cache.get(key)
+                if vec is None:
+                    misses.append(key)
+                else:
+                    found[key] = vec
+        metrics.count_embedding_lookups("memory", len(seen) - len(misses), len(misses))
+        return misses
+    
+    def _load_from_disk(self, misses: List[str], stored: dict, found: Dict[str, np.ndarray]) -> List[str]:
+        """Promote disk hits into memory; returns the keys still missing."""
+        for key, vec in stored.items():
+            self._keep(key, vec, found)
+        metrics.count_embedding_lookups("disk", len(stored), len(misses) - len(stored))
+        return [key for key in misses if key not in stored]
+    
+    def _chunks(self, keys: List[str]) -> List[List[str]]:
+        batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+        return [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+    
+    def _store_fetched(self, chunk: List[str], vectors: List[np.ndarray],
+                       found: Dict[str, np.ndarray], write_disk: bool = True):
+        for key, vec in zip(chunk, vectors):
+            self._keep(key, vec, found)
+        if write_disk and self.disk_cache is not None:
+            self.disk_cache.put_many(self.provider, self.model_name, dict(zip(chunk, vectors)))
+    
+    def _keep(self, key: str, vec: np.ndarray, found: Dict[str, np.ndarray]):
+        """Cache a loaded vector and hold on to its normalized form for this call."""
+        normalized = self.memory_cache.put(key, vec)
+        if normalized is not None:
+            found[key] = normalized
+    
+    def _assemble(self, keys: List[str], found: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        # From `found`, not the memory cache: a large batch may already have
+        # evicted its own first vectors
+        results = []
+        for key in keys:
+            vec = found.get(key) if key else None
+            # Empty text, fuzzy only / fallback, or failed fetch
+            results.append(vec if vec is not None else np.zeros(384))  # Default size for MiniLM
+        return results
+
+    def cache_stats(self) -> dict:
+        """Counters of the memory and on-disk caches (this process)."""
+        return {
+            "provider": self.provider,
+            "memory_cache": self.memory_cache.stats(),
+            "disk_cache": self.disk_cache.stats() if self.disk_cache is not None else None,
+        }
+
+    # ── Local provider (feature hashing, no network) ──
+
+    def _local_embeddings(self, keys: List[str]) -> List[np.ndarray]:
+        results = []
+        for key in keys:
+            vec = self.memory_cache.get(key)
+            if vec is None:
+                vec = self._local_embedding(key)
+                # None for the zero vector of empty/featureless text (not cached)
+                cached = self.memory_cache.put(key, vec)
+                if cached is not None:
+                    vec = cached
+            results.append(vec)
+        return results
+
+    def _local_embedding(self, text: str) -> np.ndarray:
+        return hashed_embedding(text, settings.LOCAL_EMBEDDING_DIM)
+
+    # ── Provider APIs ──
+
+    def _request_spec(self, texts: List[str]) -> Tuple[str, dict, dict]:
+        """URL, headers and JSON body of one batch embedding call."""
+        if self.provider == "openai":
+            if not settings.OPENAI_API_KEY:
+                raise Exception("OPENAI_API_KEY not set")
+            url = f"{settings.OPENAI_API_BASE.rstrip('/')}/embeddings"
+            headers = {
+                "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+                "Content-Type": "application/json"
+            }
+            return url, headers, {"input": texts, "model": settings.OPENAI_MODEL}
         
-        try:
-            if self.provider == "openai":
-                return self._get_openai_embedding(text)
-            elif self.provider == "huggingface":
-                return self._get_hf_embedding(text)
-            else:
-                # Fuzzy only / Fallback
-                return np.zeros(384)
-        except Exception as e:
-            print(f"Error fetching embedding ({self.provider}): {e}")
-            return np.zeros(384)
-
-    def _get_hf_embedding(self, text: str) -> np.ndarray:
-        """Fetch embedding from Hugging Face Inference API"""
         api_url = f"https://api-inference.huggingface.co/pipeline/feature-extraction/{settings.HF_MODEL}"
         headers = {}
         if settings.HF_API_KEY:
             headers["Authorization"] = f"Bearer {settings.HF_API_KEY}"
-            
-        # Retry logic
+        return api_url, headers, {"inputs": texts, "options": {"wait_for_model": True}}
+    
+    def _parse_response(self, texts: List[str], data) -> List[np.ndarray]:
+        """One vector per input text from a provider's JSON response."""
+        if self.provider == "openai":
+            # One item per input, tagged with its position
+            items = sorted(data['data'], key=lambda item: item['index'])
+            return [np.array(item['embedding']) for item in items]
+        
+        # HF returns one entry per input: a list of floats (embedding)
+        # or a list of lists (token-level), in which case take the first row
+        if isinstance(data, list) and len(data) == len(texts):
+            return [
+                np.array(item[0]) if item and isinstance(item[0], list) else np.array(item)
+                for item in data
+            ]
+        raise Exception(f"HF API returned {len(data) if isinstance(data, list) else type(data)} "
+                        f"embeddings for {len(texts)} inputs")
+    
+    def _fetch_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Blocking batch call over a keep-alive session."""
+        url, headers, payload = self._request_spec(texts)
+        
+        # Retry logic (HF answers 503 while the model is loading)
         for _ in range(3):
-            response = requests.post(api_url, headers=headers, json={"inputs": text, "options": {"wait_for_model": True}})
+            started = time.perf_counter()
+            response = self._session.post(url, headers=headers, json=payload,
+                                          timeout=settings.EMBEDDING_TIMEOUT_SECONDS)
+            metrics.observe_embedding_call(self.provider, time.perf_counter() - started)
             if response.status_code == 200:
-                data = response.json()
-                # HF returns list of floats (embedding) directly or list of list (if batch)
-                if isinstance(data, list):
-                    # Check if it's a list of floats or list of list
-                    if data and isinstance(data[0], list):
-                         return np.array(data[0]) 
-                    return np.array(data)
-            elif response.status_code == 503:
-                # Model loading
+                return self._parse_response(texts, response.json())
+            if response.status_code == 503 and self.provider == "huggingface":
                 time.sleep(2)
                 continue
-            else:
-                print(f"HF API Error {response.status_code}: {response.text}")
-                break
-                
-        raise Exception("Failed to get HF embedding")
-
-    def _get_openai_embedding(self, text: str) -> np.ndarray:
-        """Fetch embedding from OpenAI API"""
-        if not settings.OPENAI_API_KEY:
-             raise Exception("OPENAI_API_KEY not set")
-             
-        url = "https://api.openai.com/v1/embeddings"
-        headers = {
-            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "input": text,
-            "model": settings.OPENAI_MODEL
-        }
+            break
+        
+        raise Exception(f"{self.provider} API Error {response.status_code}: {response.text}")
+    
+    async def _afetch_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Non-blocking batch call over the pooled async client."""
+        url, headers, payload = self._request_spec(texts)
+        client = self._get_async_client()
+        
+        for _ in range(3):
+            started = time.perf_counter()
+            response = await client.post(url, headers=headers, json=payload)
+            metrics.observe_embedding_call(self.provider, time.perf_counter() - started)
+            if response.status_code == 200:
+                return self._parse_response(texts, response.json())
+            if response.status_code == 503 and self.provider == "huggingface":
+                await asyncio.sleep(2)
+                continue
+            break
         
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200:
-            res_json = response.json()
-            vec = res_json['data'][0]['embedding']
-            return np.array(vec)
-        else:
-             raise Exception(f"OpenAI API Error: {response.text}")
+        raise Exception(f"{self.provider} API Error {response.status_code}: {response.text}")
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Pooled keep-alive client, (re)created per event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                timeout=settings.EMBEDDING_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.EMBEDDING_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.EMBEDDING_MAX_CONCURRENCY,
+                ),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+    
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self._session.close()
 
     def cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calculate cosine similarity between two vectors."""
@@ -111,7 +335,22 @@ class SemanticMatcher:
         if norm1 == 0 or norm2 == 0:
             return 0.0
         
-        return float(np.dot(vec1, vec2) / (norm1 * norm2))
+        # float32 rounding can land just outside [-1, 1]
+        return float(np.clip(np.dot(vec1, vec2) / (norm1 * norm2), -1.0, 1.0))
+    
+    def cosine_similarities(self, query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        """
+        Cosine of `query` with every row of an (N x d) matrix of unit-length
+        (or all-zero) rows, as one matrix-vector product. Zero rows, e.g.
+        failed fetches, come out as 0 without a separate check, and so does
+        everything when the query itself is zero.
+        """
+        norm = float(np.linalg.norm(query))
+        if not np.isfinite(norm) or norm == 0 or matrix.shape[1] != query.shape[0]:
+            return np.zeros(matrix.shape[0], dtype=np.float32)
+        scores = matrix @ (query / norm).astype(matrix.dtype, copy=False)
+        # float32 rounding can land just outside [-1, 1]
+        return np.clip(scores, -1.0, 1.0, out=scores)
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate semantic similarity between two texts."""
@@ -123,6 +362,50 @@ class SemanticMatcher:
         
         return self.cosine_similarity(vec1, vec2)
 
+
+def hashed_embedding(text: str, dim: int) -> np.ndarray:
+    """
+    Dense vector from hashed features of the text:
+    - canonical word tokens (tokenize, so synonyms share a feature)
+    - two-word synonym phrases from SYNONYM_MAP (e.g. "face mask")
+    - character 3/4-grams of each canonical token (typo tolerance)
+    Signed hashing into `dim` buckets, then L2-normalized. Used by the
+    "local" provider.
+    """
+    if not text:
+        return np.zeros(dim)
+    
+    tokens = tokenize(text)
+    words = re.sub(r'[^a-z0-9\s]', ' ', text.lower()).split()
+    for pair in zip(words, words[1:]):
+        canonical = SYNONYM_MAP.get(" ".join(pair))
+        if canonical:
+            tokens.add(canonical)
+    
+    features = []
+    weights = []
+    for token in tokens:
+        features.append("w:" + token)
+        weights.append(1.0)
+        padded = f"<{token}>"
+        for n in (3, 4):
+            for i in range(len(padded) - n + 1):
+                features.append(f"c{n}:" + padded[i:i + n])
+                weights.append(0.25)
+    
+    if not features:
+        return np.zeros(dim)
+    
+    # crc32 is stable across processes (unlike hash()), so vectors can be shared
+    hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in features], dtype=np.uint64)
+    buckets = (hashes % dim).astype(np.int64)
+    signs = np.where((hashes >> np.uint64(31)) & np.uint64(1), -1.0, 1.0)
+    
+    vec = np.bincount(buckets, weights=signs * np.array(weights), minlength=dim)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
 # Global instance
 _semantic_matcher = None
 
@@ -132,6 +415,11 @@ def get_semantic_matcher() -> SemanticMatcher:
         _semantic_matcher = SemanticMatcher()
     return _semantic_matcher
 
+async def close_semantic_matcher():
+    """Release pooled HTTP connections (called on worker shutdown)."""
+    if _semantic_matcher is not None:
+        await _semantic_matcher.aclose()
+
 def calculate_semantic_similarity(text1: str, text2: str) -> float:
     """Convenience function."""
     matcher = get_semantic_matcher()
@@ -0,0 +1,95 @@
+"""
+Pairwise Similarity Cache
+
+Bounded LRU of hybrid similarity scores keyed by the unordered pair of
+listing texts, so supply→demand and demand→supply searches (and popular
+listings compared again and again) share one computation. Keys are a
+fixed-size blake2b digest of the ordered texts and of the provider, model
+and weights the score was computed with, so memory per entry does not
+grow with text length.
+
+The greedy fuzzy-token pairing depends on which text it starts from, so
+callers score a pair in canonical order (ordered_pair): both directions
+then get one well-defined value whether or not it came from the cache.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+def ordered_pair(first: T, second: T, text: Callable[[T], str] = str) -> Tuple[T, T]:
+    """
+    The two texts (or items whose text is text(item)) in the canonical
+    order pair scores are computed and cached in.
+    """
+    return (first, second) if text(first) <= text(second) else (second, first)
+
+
+class PairSimilarityCache:
+    """LRU of similarity scores keyed by a digest of (config, unordered text pair)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self._config = hashlib.blake2b(repr((
+            settings.SEMANTIC_PROVIDER, settings.HF_MODEL, settings.OPENAI_MODEL,
+            settings.LOCAL_EMBEDDING_DIM, settings.USE_SEMANTIC_SEARCH,
+            settings.SEMANTIC_WEIGHT, settings.FUZZY_WEIGHT,
+        )).encode(), digest_size=16).digest()
+
+    def key(self, text1: str, text2: str) -> bytes:
+        first, second = ordered_pair(text1, text2)
+        data = first.encode()
+        digest = hashlib.blake2b(self._config, digest_size=16)
+        # Length prefix, so the boundary between the texts cannot shift
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+        digest.update(second.encode())
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[float]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: bytes, value: float):
+        self._entries[key] = value
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# Global instance
+_similarity_cache = None
+
+def get_similarity_cache() -> Optional[PairSimilarityCache]:
+    """The process-wide cache, or None when PAIR_SIMILARITY_CACHE_SIZE is 0."""
+    global _similarity_cache
+    if _similarity_cache is None and settings.PAIR_SIMILARITY_CACHE_SIZE > 0:
+        _similarity_cache = PairSimilarityCache(settings.PAIR_SIMILARITY_CACHE_SIZE)
+    return _similarity_cache
@@ -0,0 +1,113 @@
+"""
+Spatial Index for Candidate Organisations
+
+Uniform latitude/longitude grid over candidate coordinates. A radius query
+only visits the cells that touch the search circle's bounding box, so the
+exact haversine check runs on nearby candidates instead of the whole pool.
+"""
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class GridIndex:
+    """
+    Buckets point indices into square lat/lon cells of `cell_size_deg`.
+    Built once per candidate pool with NumPy (sort by cell key).
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, cell_size_deg: float = 0.5):
+        if cell_size_deg <= 0:
+            raise ValueError("cell_size_deg must be positive")
+
+        self.cell_size = cell_size_deg
+        self.n_rows = int(math.ceil(180.0 / cell_size_deg))
+        self.n_cols = int(math.ceil(360.0 / cell_size_deg))
+        self.size = len(latitudes)
+
+        rows = self._rows(np.asarray(latitudes, dtype=np.float64))
+        cols = self._cols(np.asarray(longitudes, dtype=np.float64))
+        keys = rows * self.n_cols + cols
+
+        # Points grouped by cell; stable so each cell keeps input order
+        self._order = np.argsort(keys, kind="stable")
+        cell_keys, starts, counts = np.unique(keys[self._order], return_index=True, return_counts=True)
+
+        self._cell_rows = cell_keys // self.n_cols
+        self._cell_cols = cell_keys % self.n_cols
+        self._cell_starts = starts
+        self._cell_ends = starts + counts
+
+    def _rows(self, lats: np.ndarray) -> np.ndarray:
+        rows = np.floor((lats + 90.0) / self.cell_size).astype(np.int64)
+        return np.clip(rows, 0, self.n_rows - 1)
+
+    def _cols(self, lons: np.ndarray) -> np.ndarray:
+        cols = np.floor((lons + 180.0) / self.cell_size).astype(np.int64)
+        return np.mod(cols, self.n_cols)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def occupied_cells(self) -> int:
+        return len(self._cell_starts)
+
+    def _bounding_box(self, lat: float, lon: float, radius_km: float) -> Tuple[int, int, int, int]:
+        """Row range and (wrapping) column range of cells touching the circle."""
+        delta = radius_km / EARTH_RADIUS_KM  # angular radius
+        dlat = math.degrees(delta) * (1 + 1e-9) + 1e-9
+
+        lat_lo = lat - dlat
+        lat_hi = lat + dlat
+        row_lo = int(self._rows(np.array([lat_lo]))[0])
+        row_hi = int(self._rows(np.array([lat_hi]))[0])
+
+        # Circle reaches a pole, or is wider than the globe: every longitude
+        cos_lat = math.cos(math.radians(lat))
+        if lat_lo <= -90.0 or lat_hi >= 90.0 or delta >= math.pi or cos_lat <= 0:
+            return row_lo, row_hi, 0, self.n_cols - 1
+
+        ratio = math.sin(delta) / cos_lat
+        if ratio >= 1.0:
+            return row_lo, row_hi, 0, self.n_cols - 1
+
+        dlon = math.degrees(math.asin(ratio)) * (1 + 1e-9) + 1e-9
+        col_lo = int(math.floor((lon - dlon + 180.0) / self.cell_size))
+        col_hi = int(math.floor((lon + dlon + 180.0) / self.cell_size))
+        if col_hi - col_lo + 1 >= self.n_cols:
+            return row_lo, row_hi, 0, self.n_cols - 1
+        return row_lo, row_hi, col_lo, col_hi
+
+    def query(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """
+        Indices (ascending, i.e. input order) of the points in cells that
+        touch the search circle. A superset of the points within radius_km;
+        callers still apply the exact distance check.
+        """
+        if self.size == 0:
+            return np.empty(0, dtype=np.int64)
+
+        row_lo, row_hi, col_lo, col_hi = self._bounding_box(lat, lon, radius_km)
+
+        selected = (self._cell_rows >= row_lo) & (self._cell_rows <= row_hi)
+        if col_hi - col_lo + 1 < self.n_cols:
+            # Column range may wrap across the antimeridian
+            selected &= np.mod(self._cell_cols - col_lo, self.n_cols) <= (col_hi - col_lo)
+
+        cells = np.flatnonzero(selected)
+        if len(cells) == self.occupied_cells:
+            return np.arange(self.size, dtype=np.int64)
+        if len(cells) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        idx = np.concatenate([
+            self._order[s:e]
+            for s, e in zip(self._cell_starts[cells].tolist(), self._cell_ends[cells].tolist())
+        ])
+        idx.sort()
+        return idx
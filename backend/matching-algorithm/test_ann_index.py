@@ -0,0 +1,143 @@
+"""
+Tests for the resident store's ANN index
+
+Runs in-process with the local embedding provider (no server, no network):
+
+    python -m pytest -q test_ann_index.py
+"""
+
+import os
+
+os.environ.setdefault("SEMANTIC_PROVIDER", "local")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from ann_index import IVFIndex
+from candidate_store import CandidateStore
+from config import get_settings
+from main import DemandData, OrgData, SupplyData
+from matching import PreparedListing, score_candidates, score_candidates_async
+
+ITEM_NAMES = ["steel scrap", "copper wire", "wood pallets", "glass bottles", "plastic film", "the"]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SEMANTIC_PROVIDER", "local")
+    monkeypatch.setattr(settings, "USE_SEMANTIC_SEARCH", True)
+    monkeypatch.setattr(settings, "ANN_MIN_CANDIDATES", 1)
+    store = CandidateStore()
+    store._ann = {side: IVFIndex() for side in store._ann}
+    store.upsert_orgs([
+        OrgData(org_id=org_id, org_name=f"Org {org_id}", latitude=50.0 + org_id / 100, longitude=14.0)
+        for org_id in (1, 2)
+    ])
+    store.upsert_listings("supply", [
+        SupplyData(supply_id=i, org_id=2, item_name=name) for i, name in enumerate(ITEM_NAMES, start=1)
+    ])
+    return store
+
+
+def search(store):
+    demand = DemandData(demand_id=100, org_id=1, item_name="metal scrap")
+    source = PreparedListing(demand, store.orgs[1], "demand")
+    return score_candidates(source, store.pool("supply"), 100.0, exclude_org_id=1)
+
+
+def test_unembeddable_listing_completes_sync(store):
+    """A stopword-only listing stays out of the index but is no longer pending."""
+    assert len(store._ann_pending["supply"]) == len(ITEM_NAMES)
+    search(store)
+
+    stats = store.ann_stats()["supply"]
+    assert stats["pending"] == 0
+    assert stats["entries"] == len(ITEM_NAMES) - 1
+    assert len(ITEM_NAMES) not in store._ann["supply"]
+
+
+def test_upsert_and_delete_update_index(store):
+    search(store)
+    index = store._ann["supply"]
+    before = index.search(store.listings["supply"][1].embedding, k=1)[1][0]
+
+    # Same text: stays indexed; new text: re-embedded on the next search
+    store.upsert_listings("supply", [
+        SupplyData(supply_id=1, org_id=2, item_name="steel scrap", price_per_unit=5.0),
+        SupplyData(supply_id=2, org_id=2, item_name="aluminium cans"),
+        SupplyData(supply_id=7, org_id=2, item_name="cardboard boxes"),
+    ])
+    assert store._ann_pending["supply"] == {2, 7}
+    assert 1 in index and 2 not in index
+
+    search(store)
+    assert not store._ann_pending["supply"]
+    assert 2 in index and 7 in index
+    ids, scores = index.search(store.listings["supply"][2].embedding, k=1)
+    assert ids[0] == 2 and scores[0] == pytest.approx(1.0, abs=1e-5)
+    assert index.search(store.listings["supply"][1].embedding, k=1)[1][0] == pytest.approx(before)
+
+    store.delete_listings("supply", [2])
+    store.delete_orgs([2])
+    assert len(index) == 0
+    assert not store._ann_pending["supply"]
+
+
+def test_failed_fetch_stays_pending(store):
+    pool = store.pool("supply")
+    items = pool.ann_missing()
+    for item in items:
+        item._embedding = np.zeros(384)
+    pool.add_to_ann_index(items, complete=False)
+    assert len(store._ann_pending["supply"]) == len(ITEM_NAMES)
+
+    # A detached pool (store changed since) leaves the index alone
+    store.upsert_listings("supply", [SupplyData(supply_id=8, org_id=2, item_name="rubber tyres")])
+    pool.add_to_ann_index(items)
+    assert len(store._ann_pending["supply"]) == len(ITEM_NAMES) + 1
+
+
+def test_ivf_search_matches_exact_scan():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(4000, 16)).astype(np.float32)
+    index = IVFIndex(n_probe=1000)
+    index.add(list(range(len(vectors))), vectors)
+    assert index.trained
+
+    query = rng.normal(size=16).astype(np.float32)
+    ids, _ = index.search(query, k=10)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ query), kind="stable")[:10]
+    assert ids.tolist() == expected.tolist()
+
+
+def test_shortlist_keeps_category_matches(store, monkeypatch):
+    """Same-category listings far from the source by embedding still reach the results."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ANN_CANDIDATES", 1)
+    store.upsert_listings("supply", [
+        SupplyData(supply_id=20 + i, org_id=2, item_name=name, item_category="Metals")
+        for i, name in enumerate(["rebar offcuts", "iron filings", "old radiators"])
+    ])
+    demand = DemandData(demand_id=101, org_id=1, item_name="metal scrap", item_category="metals")
+    source = PreparedListing(demand, store.orgs[1], "demand")
+    pool = store.pool("supply")
+
+    shortlisted = {m["id"] for m in score_candidates(source, pool, 100.0, exclude_org_id=1)}
+    exact = {m["id"] for m in score_candidates(source, pool, 100.0, exclude_org_id=1, full_scan=True)}
+    # The one embedding neighbour ("steel scrap") plus every category match
+    assert shortlisted == {1, 20, 21, 22}
+    assert shortlisted <= exact
+
+
+def test_async_search_syncs_index(store):
+    demand = DemandData(demand_id=102, org_id=1, item_name="metal scrap")
+    source = PreparedListing(demand, store.orgs[1], "demand")
+    results = asyncio.run(score_candidates_async(source, store.pool("supply"), 100.0, exclude_org_id=1))
+
+    assert results == search(store)
+    assert store.ann_stats()["supply"]["pending"] == 0
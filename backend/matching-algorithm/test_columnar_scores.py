@@ -0,0 +1,124 @@
+"""
+Tests for the columnar match scores
+
+calculate_context_scores_columnar, calculate_match_scores_columnar and
+round3_columnar must agree exactly with the scalar functions they replace:
+
+    python -m pytest -q test_columnar_scores.py
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from utils import (
+    PRICE_LABELS,
+    QUANTITY_LABELS,
+    calculate_context_scores,
+    calculate_context_scores_columnar,
+    calculate_match_score_detailed,
+    calculate_match_scores_columnar,
+    normalize_quantity,
+    round3_columnar,
+    unit_class_code,
+)
+
+UNITS = ["kg", "g", "ton", "tonne", "l", "litre", "ml", "pcs", "units", "boxes", None, ""]
+
+
+def random_row(rng: random.Random):
+    demand_price = rng.choice([None, 0.0, -1.0, 10.0, rng.uniform(0.1, 100.0)])
+    # Prices on and around the label boundaries as well as random ones
+    if demand_price and demand_price > 0:
+        supply_price = rng.choice([
+            None, 0.0, demand_price, demand_price * 0.5, demand_price * 0.8,
+            demand_price * 1.25, demand_price * 1.5, rng.uniform(0.1, 3.0) * demand_price,
+        ])
+    else:
+        supply_price = rng.choice([None, 0.0, rng.uniform(0.1, 100.0)])
+
+    demand_qty = rng.choice([None, 0.0, 100.0, rng.uniform(1.0, 5000.0)])
+    supply_qty = rng.choice([
+        None, demand_qty, (demand_qty or 1.0) * rng.choice([0.25, 0.5, 0.8, 1.0]),
+        rng.uniform(1.0, 5000.0),
+    ])
+    return {
+        "distance_km": rng.choice([0.0, rng.uniform(0.0, 120.0)]),
+        "supply_price": supply_price,
+        "demand_max_price": demand_price,
+        "max_distance": 50.0,
+        "supply_qty": supply_qty,
+        "supply_unit": rng.choice(UNITS),
+        "demand_qty": demand_qty,
+        "demand_unit": rng.choice(UNITS),
+    }
+
+
+def to_columns(rows):
+    def col(values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+    def qty(kind):
+        return col([
+            None if row[f"{kind}_qty"] is None else normalize_quantity(row[f"{kind}_qty"], row[f"{kind}_unit"])
+            for row in rows
+        ])
+
+    return dict(
+        distance_km=col([row["distance_km"] for row in rows]),
+        supply_price=col([row["supply_price"] for row in rows]),
+        demand_max_price=col([row["demand_max_price"] for row in rows]),
+        max_distance=50.0,
+        supply_qty=qty("supply"),
+        supply_unit_class=np.array([unit_class_code(row["supply_unit"]) for row in rows], dtype=np.int64),
+        demand_qty=qty("demand"),
+        demand_unit_class=np.array([unit_class_code(row["demand_unit"]) for row in rows], dtype=np.int64),
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_context_scores_match_scalar(seed):
+    rng = random.Random(seed)
+    rows = [random_row(rng) for _ in range(4000)]
+    columnar = calculate_context_scores_columnar(**to_columns(rows))
+
+    for i, row in enumerate(rows):
+        expected = calculate_context_scores(**row)
+        assert columnar["distance"][i] == expected["distance"]
+        assert columnar["price"][i] == expected["price"]
+        assert columnar["quantity"][i] == expected["quantity"]
+        assert PRICE_LABELS[columnar["price_label"][i]] == expected["price_label"]
+        assert QUANTITY_LABELS[columnar["quantity_label"][i]] == expected["quantity_label"]
+        pct = columnar["fulfillment_pct"][i]
+        assert (None if math.isnan(pct) else pct) == expected["fulfillment_pct"]
+
+
+def test_match_scores_match_scalar():
+    rng = random.Random(42)
+    rows = [random_row(rng) for _ in range(4000)]
+    similarity = np.array([rng.choice([0.0, 0.2, 0.8, 1.0, 1.2, rng.random()]) for _ in rows])
+    scores = calculate_match_scores_columnar(similarity, calculate_context_scores_columnar(**to_columns(rows)))
+
+    for i, row in enumerate(rows):
+        expected = calculate_match_score_detailed(row["distance_km"], float(similarity[i]), row["supply_price"],
+                                                  row["demand_max_price"], row["max_distance"], row["supply_qty"],
+                                                  row["supply_unit"], row["demand_qty"], row["demand_unit"])
+        assert scores["match_score"][i] == expected["match_score"]
+        for part in ("similarity", "distance", "price", "quantity"):
+            assert scores[part][i] == expected["breakdown"][part]
+
+
+def test_round3_matches_round():
+    rng = np.random.default_rng(3)
+    values = np.concatenate([
+        rng.random(100_000),
+        rng.random(20_000) * 100,
+        # Decimal midpoints, which binary floats sit just above or below
+        (np.arange(0, 2000) + 0.5) / 1000,
+        np.nextafter((np.arange(0, 2000) + 0.5) / 1000, 0),
+        np.nextafter((np.arange(0, 2000) + 0.5) / 1000, 1),
+        [0.0, 1.0, 0.0005, 0.9995, 0.1235, 0.2345],
+    ])
+    assert round3_columnar(values).tolist() == [round(float(v), 3) for v in values]
@@ -0,0 +1,50 @@
+"""
+Tests for per-request profiling
+
+Runs in-process:
+
+    python -m pytest -q test_profiling.py
+"""
+
+import os
+
+os.environ.setdefault("SEMANTIC_PROVIDER", "local")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+from fastapi.testclient import TestClient
+
+from benchmarks.workload import match_request
+from main import app
+
+client = TestClient(app)
+
+
+def post(request, **params):
+    response = client.post("/match/demand-to-supplies", json=request, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def test_profiled_repeat_reports_stages():
+    """A profiled request is computed even when identical results are cached."""
+    client.delete("/results/cache").raise_for_status()
+    request = match_request("demand", 1500, 11)
+
+    plain = post(request)
+    cached = client.get("/results/cache").json()
+    first = post(request, profile="true")
+    repeat = post(request, profile="true", profile_top=5)
+
+    for response in (first, repeat):
+        assert response["results"] == plain["results"]
+        profile = response["profile"]
+        assert profile["result_cache"] == "bypass"
+        assert "distance_filter" in profile["stages_ms"]
+        assert profile["candidates"]
+    assert repeat["profile"]["cprofile"]
+
+    # Profiled requests neither read nor fill the cache; plain repeats still hit it
+    stats = client.get("/results/cache").json()
+    assert (stats["hits"], stats["entries"]) == (cached["hits"], cached["entries"])
+    post(request)
+    assert client.get("/results/cache").json()["hits"] == cached["hits"] + 1
@@ -0,0 +1,195 @@
+"""
+Tests for candidate scoring
+
+The bounded, heap-based top-K in _score_in_radius must return what
+scoring every in-radius candidate with the scalar functions and sorting
+them all would return:
+
+    python -m pytest -q test_scoring.py
+"""
+
+import os
+
+os.environ.setdefault("SEMANTIC_PROVIDER", "local")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+import asyncio
+import pickle
+from concurrent.futures import Executor, Future
+
+import pytest
+
+from benchmarks.workload import match_request
+from config import get_settings
+from main import MatchDemandRequest, MatchSupplyRequest
+from matching import (
+    MIN_MATCH_SCORE,
+    CandidatePool,
+    PreparedListing,
+    _pair_similarity,
+    _score_in_processes,
+    _select_candidates,
+    iter_scored_chunks,
+    check_category_match,
+    score_candidates,
+    score_candidates_async,
+)
+from similarity_cache import get_similarity_cache
+from utils import calculate_distances, calculate_match_score_detailed
+
+settings = get_settings()
+
+
+@pytest.fixture(autouse=True, params=[False, True], ids=["fuzzy", "semantic"])
+def semantic_mode(request, monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_PROVIDER", "local")
+    monkeypatch.setattr(settings, "USE_SEMANTIC_SEARCH", request.param)
+    # Pair scores are keyed by the settings at start-up
+    if get_similarity_cache() is not None:
+        get_similarity_cache().clear()
+
+
+def build(side: str, size: int, seed: int, radius: float):
+    """Source listing and request-built pool from a benchmark workload."""
+    other = "demand" if side == "supply" else "supply"
+    schema = MatchSupplyRequest if side == "supply" else MatchDemandRequest
+    request = schema(**match_request(side, size, seed, radius))
+    source = PreparedListing(getattr(request, side), getattr(request, f"{side}_org"), side)
+    return source, CandidatePool.from_candidates(request.candidates, other)
+
+
+def reference_ranking(source: PreparedListing, pool: CandidatePool, radius: float):
+    """Every candidate scored one by one with its full detail, stable-sorted."""
+    distances = calculate_distances(source.org.latitude, source.org.longitude, pool.latitudes, pool.longitudes)
+    rows = []
+    for cand, distance in zip(pool.items, distances.tolist()):
+        if distance > radius or cand.org.org_id == source.org.org_id:
+            continue
+        cat_match = check_category_match(
+            source.listing.category_id, cand.listing.category_id,
+            source.listing.item_category, cand.listing.item_category
+        )
+        similarity = _pair_similarity(source, cand)
+        if not cat_match and similarity < settings.SIMILARITY_THRESHOLD:
+            continue
+        if cat_match:
+            similarity = min(1.0, max(similarity, 0.65) + 0.15)
+
+        supply, demand = (source, cand) if source.side == "supply" else (cand, source)
+        detail = calculate_match_score_detailed(
+            distance, similarity, supply.price, demand.price, radius,
+            supply.listing.quantity, supply.listing.quantity_unit,
+            demand.listing.quantity, demand.listing.quantity_unit,
+        )
+        if detail["match_score"] >= MIN_MATCH_SCORE:
+            rows.append({
+                "id": cand.listing_id,
+                "match_score": detail["match_score"],
+                "name_similarity": round(similarity, 3),
+                "category_matched": cat_match,
+                "score_breakdown": detail["breakdown"],
+                "match_labels": detail["labels"],
+            })
+    rows.sort(key=lambda row: -row["match_score"])
+    return rows
+
+
+def ranking(rows):
+    return [(row["id"], row["match_score"]) for row in rows]
+
+
+@pytest.mark.parametrize("side", ["supply", "demand"])
+@pytest.mark.parametrize("seed", range(3))
+def test_top_k_matches_full_sort(side, seed):
+    radius = 80.0
+    source, pool = build(side, 1500, seed, radius)
+    expected = ranking(reference_ranking(source, pool, radius))
+    assert len(expected) > 30
+
+    for limit in (1, 5, 30, len(expected) + 10, None):
+        results = score_candidates(source, pool, radius, limit=limit, exclude_org_id=source.org.org_id,
+                                   full_scan=True)
+        assert ranking(results) == expected[:limit]
+
+
+def test_zero_limit_returns_nothing():
+    source, pool = build("demand", 200, 0, 50.0)
+    assert score_candidates(source, pool, 50.0, limit=0) == []
+
+
+@pytest.mark.parametrize("side", ["supply", "demand"])
+def test_explanations_of_returned_rows(side):
+    """Breakdowns and labels built for the top K only equal the detailed scalar score."""
+    radius = 80.0
+    source, pool = build(side, 1500, 7, radius)
+    expected = reference_ranking(source, pool, radius)[:settings.MAX_RESULTS]
+    results = score_candidates(source, pool, radius, limit=settings.MAX_RESULTS,
+                               exclude_org_id=source.org.org_id, full_scan=True)
+
+    assert len(results) == len(expected) > 0
+    for row, reference in zip(results, expected):
+        assert {key: row[key] for key in reference} == reference
+
+
+@pytest.mark.parametrize("full_scan", [False, True])
+def test_async_matches_sync(full_scan):
+    radius = 80.0
+    source, pool = build("demand", 1500, 2, radius)
+    expected = score_candidates(source, pool, radius, limit=30, full_scan=full_scan)
+    results = asyncio.run(score_candidates_async(source, pool, radius, limit=30, full_scan=full_scan))
+    assert results == expected
+
+
+class PicklingExecutor(Executor):
+    """Runs calls inline after a pickle round trip, like a process pool, keeping the payloads."""
+
+    def __init__(self):
+        self.payloads = []
+
+    def submit(self, fn, *args):
+        payload = pickle.dumps((fn, args))
+        self.payloads.append(payload)
+        fn, args = pickle.loads(payload)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_worker_chunks_carry_no_embeddings(monkeypatch):
+    monkeypatch.setattr(settings, "SCORING_WORKERS", 3)
+    radius = 80.0
+    source, pool = build("supply", 1500, 1, radius)
+    expected = score_candidates(source, pool, radius, limit=30)
+
+    in_radius, distances = _select_candidates(source, pool, radius, None, False)
+    executor = PicklingExecutor()
+    results = asyncio.run(_score_in_processes(executor, source, pool, in_radius, distances, radius, 30))
+    assert results == expected
+    assert len(executor.payloads) > 1
+
+    for payload in executor.payloads:
+        _, (chunk_source, items, *_rest) = pickle.loads(payload)
+        assert chunk_source._embedding is None
+        assert all(item._embedding is None for item in items)
+    if settings.USE_SEMANTIC_SEARCH:
+        embedding_bytes = sum(pool.items[i].embedding.nbytes for i in in_radius.tolist())
+        assert sum(len(payload) for payload in executor.payloads) < embedding_bytes
+
+
+def test_stream_holds_one_chunk_of_embeddings():
+    radius = 80.0
+    source, pool = build("demand", 1500, 3, radius)
+    expected = score_candidates(source, pool, radius)
+    for item in pool.items:
+        item._embedding = None
+
+    async def stream():
+        rows, held = [], []
+        async for chunk in iter_scored_chunks(source, pool, radius, chunk_size=50):
+            rows.extend(chunk)
+            held.append(sum(item._embedding is not None for item in pool.items))
+        return rows, held
+
+    rows, held = asyncio.run(stream())
+    assert sorted(rows, key=lambda row: row["id"]) == sorted(expected, key=lambda row: row["id"])
+    assert len(held) > 1 and max(held) == 0
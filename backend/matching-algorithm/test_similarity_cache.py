@@ -0,0 +1,38 @@
+"""
+Tests for the pairwise similarity cache
+
+    python -m pytest -q test_similarity_cache.py
+"""
+
+from similarity_cache import PairSimilarityCache, ordered_pair
+
+
+def test_key_is_unordered_and_fixed_size():
+    cache = PairSimilarityCache(10)
+    long_text = "industrial grade stainless steel pipes " * 50
+    assert cache.key("rice", long_text) == cache.key(long_text, "rice")
+    assert len(cache.key("rice", long_text)) == len(cache.key("a", "b")) == 16
+
+
+def test_key_separates_text_boundaries():
+    cache = PairSimilarityCache(10)
+    assert cache.key("ab", "c") != cache.key("a", "bc")
+    assert cache.key("a", "b") != cache.key("a", "c")
+
+
+def test_lru_eviction():
+    cache = PairSimilarityCache(2)
+    for i, pair in enumerate([("a", "b"), ("a", "c"), ("a", "d")]):
+        cache.put(cache.key(*pair), float(i))
+    assert cache.get(cache.key("b", "a")) is None
+    assert cache.get(cache.key("d", "a")) == 2.0
+
+
+def test_ordered_pair_by_text():
+    class Item:
+        def __init__(self, text):
+            self.text = text
+
+    first, second = Item("wheat"), Item("rice")
+    assert ordered_pair(first, second, text=lambda item: item.text) == (second, first)
+    assert ordered_pair("wheat", "rice") == ("rice", "wheat")
@@ -0,0 +1,110 @@
+"""
+Tests for the resident candidate store
+
+Store searches must return what the one-shot endpoints return for the same
+candidates, also after upserts and deletes. Runs in-process:
+
+    python -m pytest -q test_store.py
+"""
+
+import os
+
+os.environ.setdefault("SEMANTIC_PROVIDER", "local")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.workload import HUBS, make_demand, make_org, make_pool, make_supply
+from config import get_settings
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    # Resident pools prefilter by token/category by default; one-shot pools do not
+    monkeypatch.setattr(get_settings(), "TOKEN_INDEX_PREFILTER", False)
+    client.delete("/store").raise_for_status()
+    yield
+    client.delete("/store").raise_for_status()
+
+
+def load(side: str, size: int, seed: int = 0):
+    orgs, listings = make_pool(side, size, seed)
+    client.put("/store/orgs", json={"orgs": orgs}).raise_for_status()
+    plural = "supplies" if side == "supply" else "demands"
+    client.put(f"/store/{plural}", json={plural: listings}).raise_for_status()
+    return {org["org_id"]: org for org in orgs}, {listing[f"{side}_id"]: listing for listing in listings}
+
+
+def source(side: str, seed: int = 0):
+    rng = random.Random(f"test-store:{side}:{seed}")
+    lat, lon = HUBS[seed % len(HUBS)]
+    org = {**make_org(rng, 10_000_000), "latitude": lat, "longitude": lon}
+    listing = (make_supply if side == "supply" else make_demand)(rng, 10_000_000, org["org_id"])
+    return listing, org
+
+
+def results(response):
+    response.raise_for_status()
+    body = response.json()
+    body.pop("computed_at")
+    return body
+
+
+def compare(side: str, orgs, listings, **options):
+    """Store and one-shot responses for the same source and candidates."""
+    other = "demand" if side == "supply" else "supply"
+    path = "supply-to-demands" if side == "supply" else "demand-to-supplies"
+    listing, org = source(side)
+    request = {side: listing, f"{side}_org": org, "search_radius": 80.0, **options}
+    candidates = [{other: cand, "org": orgs[cand["org_id"]]} for cand in listings.values()]
+
+    stored = results(client.post(f"/store/match/{path}", json=request))
+    one_shot = results(client.post(f"/match/{path}", json={**request, "candidates": candidates}))
+    assert stored["total_results"] > 0
+    return stored, one_shot
+
+
+@pytest.mark.parametrize("side", ["supply", "demand"])
+@pytest.mark.parametrize("full_scan", [False, True])
+def test_store_matches_one_shot(side, full_scan):
+    other = "demand" if side == "supply" else "supply"
+    orgs, listings = load(other, 2000)
+    stored, one_shot = compare(side, orgs, listings, full_scan=full_scan)
+    assert stored == one_shot
+
+
+def test_store_follows_upserts_and_deletes():
+    orgs, supplies = load("supply", 2000)
+    before, _ = compare("demand", orgs, supplies)
+
+    # Drop the best match, rename the second and move the third's org
+    first, second, third = (row["id"] for row in before["results"][:3])
+    client.post("/store/supplies/delete", json={"ids": [first]}).raise_for_status()
+    del supplies[first]
+    supplies[second] = {**supplies[second], "item_name": "assorted office furniture"}
+    client.put("/store/supplies", json={"supplies": [supplies[second]]}).raise_for_status()
+    moved = {**orgs[supplies[third]["org_id"]], "latitude": 0.0, "longitude": 0.0}
+    orgs[moved["org_id"]] = moved
+    client.put("/store/orgs", json={"orgs": [moved]}).raise_for_status()
+
+    stored, one_shot = compare("demand", orgs, supplies)
+    assert stored == one_shot
+    assert first not in {row["id"] for row in stored["results"]}
+    assert stored != before
+
+
+def test_org_delete_removes_listings():
+    orgs, supplies = load("supply", 500)
+    org_id = next(iter(orgs))
+    client.post("/store/orgs/delete", json={"ids": [org_id]}).raise_for_status()
+    remaining = {i: s for i, s in supplies.items() if s["org_id"] != org_id}
+
+    assert client.get("/store").json()["supplies"] == len(remaining)
+    stored, one_shot = compare("demand", {i: o for i, o in orgs.items() if i != org_id}, remaining)
+    assert stored == one_shot
@@ -0,0 +1,65 @@
+"""
+Tests for the fuzzy token pairing
+
+fuzzy_token_matches must give exactly what the reference nested loop
+(_greedy_loop) gives, on both the loop and the matrix path:
+
+    python -m pytest -q test_token_similarity.py
+"""
+
+import random
+
+import pytest
+
+from token_similarity import MATRIX_MIN_PAIRS, _greedy_loop, fuzzy_token_matches
+from utils import calculate_token_overlap, tokenize
+
+VOCABULARY = [
+    "steel", "steels", "stainless", "steal", "copper", "coppers", "wire", "wires", "wiring",
+    "rice", "basmati", "brown", "wheat", "flour", "oil", "oils", "soil", "pipe", "pipes",
+    "pvc", "cement", "cements", "brick", "bricks", "plastic", "plastics", "paper", "pallet",
+    "pallets", "wood", "wooden", "a", "ab", "abc",
+]
+
+
+def random_tokens(rng: random.Random, size: int):
+    tokens = []
+    for _ in range(size):
+        word = rng.choice(VOCABULARY)
+        if rng.random() < 0.3:
+            # Typos: drop or swap in a character
+            pos = rng.randrange(len(word))
+            word = word[:pos] + (rng.choice("aeiourst") if rng.random() < 0.5 else "") + word[pos + 1:]
+        tokens.append(word)
+    return tokens
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference_loop(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        tokens1 = random_tokens(rng, rng.randint(0, 14))
+        tokens2 = random_tokens(rng, rng.randint(0, 14))
+        assert fuzzy_token_matches(tokens1, tokens2) == _greedy_loop(tokens1, tokens2)
+
+
+def test_matrix_path_ties_and_containment():
+    # Large enough for the matrix path; several equal-scoring partners
+    tokens1 = ["pipe", "pipes", "pip", "oil", "soil", "oils", "wire", "wir"]
+    tokens2 = ["pipes", "pipe", "oil", "soils", "wires", "wiring", "piper"]
+    assert len(tokens1) * len(tokens2) >= MATRIX_MIN_PAIRS
+    assert fuzzy_token_matches(tokens1, tokens2) == _greedy_loop(tokens1, tokens2)
+    assert fuzzy_token_matches(tokens2, tokens1) == _greedy_loop(tokens2, tokens1)
+
+
+def test_empty_tokens_use_loop():
+    tokens1 = ["", "steel", "copper", "wire", "rice", "oil", "pipe"]
+    tokens2 = ["steels", "", "coppers", "wires", "flour", "oils", "pipes", "brick"]
+    assert fuzzy_token_matches(tokens1, tokens2) == _greedy_loop(tokens1, tokens2)
+    assert fuzzy_token_matches([], tokens2) == 0.0
+
+
+def test_token_overlap_bounds():
+    overlap = calculate_token_overlap(tokenize("stainless steel pipes"), tokenize("steel pipe fittings"))
+    assert 0.0 < overlap <= 1.0
+    assert calculate_token_overlap(tokenize("copper wire"), tokenize("copper wire")) == 1.0
@@ -0,0 +1,96 @@
+"""
+Inverted Token / Category Index
+
+Maps canonical tokens (tokenize + SYNONYM_MAP) and categories to candidate
+positions in a pool. Used to shortlist candidates that share at least one
+token or a compatible category with the source, so only those reach the
+full hybrid similarity.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+
+def _normalize_category(name: Optional[str]) -> str:
+    return (name or "").lower().strip()
+
+
+class TokenIndex:
+    """Postings from canonical token, category id and category name to positions."""
+
+    def __init__(
+        self,
+        token_sets: Iterable[Set[str]],
+        category_ids: Iterable[Optional[int]],
+        category_names: Iterable[Optional[str]],
+    ):
+        tokens: Dict[str, List[int]] = defaultdict(list)
+        by_id: Dict[int, List[int]] = defaultdict(list)
+        by_name: Dict[str, List[int]] = defaultdict(list)
+
+        size = 0
+        for pos, (token_set, cat_id, cat_name) in enumerate(zip(token_sets, category_ids, category_names)):
+            for token in token_set:
+                tokens[token].append(pos)
+            if cat_id is not None:
+                by_id[cat_id].append(pos)
+            name = _normalize_category(cat_name)
+            if name:
+                by_name[name].append(pos)
+            size = pos + 1
+
+        self.size = size
+        self._tokens = {k: np.array(v, dtype=np.int64) for k, v in tokens.items()}
+        self._category_ids = {k: np.array(v, dtype=np.int64) for k, v in by_id.items()}
+        self._category_names = {k: np.array(v, dtype=np.int64) for k, v in by_name.items()}
+
+    @classmethod
+    def from_items(cls, items) -> "TokenIndex":
+        """Build from PreparedListing objects (tokens are computed if needed)."""
+        return cls(
+            (item.tokens for item in items),
+            (item.listing.category_id for item in items),
+            (item.listing.item_category for item in items),
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._tokens)
+
+    def lookup(self, tokens: Set[str], category_id: Optional[int], category_name: Optional[str]) -> np.ndarray:
+        """
+        Sorted positions sharing a token with `tokens`, or a category that
+        check_category_match would accept (same id, or names equal or
+        contained in one another).
+        """
+        postings = [self._tokens[t] for t in tokens if t in self._tokens]
+        postings.extend(self._category_postings(category_id, category_name))
+
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+    def category_lookup(self, category_id: Optional[int], category_name: Optional[str]) -> np.ndarray:
+        """Sorted positions with a category check_category_match would accept."""
+        postings = self._category_postings(category_id, category_name)
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+    def _category_postings(self, category_id: Optional[int], category_name: Optional[str]) -> List[np.ndarray]:
+        postings = []
+        if category_id is not None and category_id in self._category_ids:
+            postings.append(self._category_ids[category_id])
+
+        name = _normalize_category(category_name)
+        if name:
+            # Distinct category names are few; containment needs a scan of them
+            for other, positions in self._category_names.items():
+                if name == other or name in other or other in name:
+                    postings.append(positions)
+        return postings
@@ -0,0 +1,113 @@
+"""
+Fuzzy Token Matching
+
+Greedy one-to-one pairing of the tokens two texts do not share exactly,
+used by calculate_token_overlap. For larger token sets the pair scores are
+computed as one matrix: Levenshtein ratios through RapidFuzz's cdist (the
+library python-Levenshtein is built on) and substring containment through
+one C-level string search per token, instead of a Python-level loop over
+every pair.
+"""
+
+from bisect import bisect_right
+from typing import List, Sequence
+
+import numpy as np
+import Levenshtein
+from rapidfuzz import process
+from rapidfuzz.distance import Indel
+
+# Token pairs scoring below this are not fuzzy matches
+FUZZY_CUTOFF = 0.7
+# Score given when one token contains the other (overrides the ratio)
+CONTAINMENT_SCORE = 0.85
+# Below this many pairs the plain loop is cheaper than building a matrix
+MATRIX_MIN_PAIRS = 48
+
+_SEPARATOR = "\x00"
+
+
+def _greedy_loop(remaining1: Sequence[str], remaining2: Sequence[str]) -> float:
+    """Reference pairing: each token of remaining1 takes its best unused partner."""
+    fuzzy_matches = 0.0
+    matched_from_2 = set()
+
+    for t1 in remaining1:
+        best_score = 0.0
+        best_match = None
+        for t2 in remaining2:
+            if t2 in matched_from_2:
+                continue
+            # Check substring containment
+            if t1 in t2 or t2 in t1:
+                score = CONTAINMENT_SCORE
+            else:
+                score = Levenshtein.ratio(t1, t2)
+
+            if score > best_score and score >= FUZZY_CUTOFF:
+                best_score = score
+                best_match = t2
+
+        if best_match:
+            fuzzy_matches += best_score
+            matched_from_2.add(best_match)
+
+    return fuzzy_matches
+
+
+def _containment_pairs(needles: List[str], haystack: List[str]):
+    """Yield (i, j) where needles[i] is a substring of haystack[j]."""
+    joined = _SEPARATOR.join(haystack)
+    starts = []
+    offset = 0
+    for token in haystack:
+        starts.append(offset)
+        offset += len(token) + 1
+
+    for i, needle in enumerate(needles):
+        pos = joined.find(needle)
+        while pos != -1:
+            yield i, bisect_right(starts, pos) - 1
+            pos = joined.find(needle, pos + 1)
+
+
+def _score_matrix(tokens1: List[str], tokens2: List[str]) -> np.ndarray:
+    """Pair scores as the reference loop sees them; 0.0 below the cutoff."""
+    scores = process.cdist(
+        tokens1, tokens2,
+        scorer=Indel.normalized_similarity,  # == Levenshtein.ratio
+        score_cutoff=FUZZY_CUTOFF,
+        dtype=np.float64,
+    )
+    for i, j in _containment_pairs(tokens1, tokens2):
+        scores[i, j] = CONTAINMENT_SCORE
+    for j, i in _containment_pairs(tokens2, tokens1):
+        scores[i, j] = CONTAINMENT_SCORE
+    return scores
+
+
+def fuzzy_token_matches(remaining1, remaining2) -> float:
+    """
+    Sum of fuzzy scores when each token of remaining1 (in iteration order)
+    is paired with its best not-yet-used token of remaining2; ties go to
+    the token met first. Identical to the nested loop for any input.
+    """
+    tokens1 = list(remaining1)
+    # The loop marks partners used by value: a repeated token pairs once
+    tokens2 = list(dict.fromkeys(remaining2))
+    if not tokens1 or not tokens2:
+        return 0.0
+
+    if len(tokens1) * len(tokens2) < MATRIX_MIN_PAIRS or "" in remaining1 or "" in remaining2:
+        return _greedy_loop(tokens1, tokens2)
+
+    scores = _score_matrix(tokens1, tokens2)
+    fuzzy_matches = 0.0
+    for row in scores:
+        j = int(row.argmax())  # first maximum, like the strict '>' in the loop
+        best = row[j]
+        if best > 0.0:
+            fuzzy_matches += float(best)
+            scores[:, j] = 0.0
+
+    return fuzzy_matches
@@ -2,9 +2,12 @@
 
 import math
 import re
-from typing import Tuple, Set
+from typing import Set, Optional
+import numpy as np
 import Levenshtein
 
+from token_similarity import fuzzy_token_matches
+
 
 # ═══════════════════════════════════════════════════════════════
 # Text Normalization & Tokenization
@@ -114,28 +117,7 @@ def calculate_token_overlap(tokens1: Set[str], tokens2: Set[str]) -> float:
     remaining1 = tokens1 - exact_overlap
     remaining2 = tokens2 - exact_overlap
     
-    fuzzy_matches = 0.0
-    matched_from_2 = set()
-    
-    for t1 in remaining1:
-        best_score = 0.0
-        best_match = None
-        for t2 in remaining2:
-            if t2 in matched_from_2:
-                continue
-            # Check substring containment
-            if t1 in t2 or t2 in t1:
-                score = 0.85
-            else:
-                score = Levenshtein.ratio(t1, t2)
-            
-            if score > best_score and score >= 0.7:
-                best_score = score
-                best_match = t2
-        
-        if best_match:
-            fuzzy_matches += best_score
-            matched_from_2.add(best_match)
+    fuzzy_matches = fuzzy_token_matches(remaining1, remaining2)
     
     total_matched = len(exact_overlap) + fuzzy_matches
     union_size = len(tokens1 | tokens2)
@@ -171,11 +153,37 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return c * r
 
 
+def calculate_distances(lat1: float, lon1: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Vectorized calculate_distance: great circle distances (in kilometers)
+    from one point to arrays of points, in a single NumPy pass.
+    """
+    lat1_rad = math.radians(lat1)
+    lon1_rad = math.radians(lon1)
+    lat2_rad = np.radians(lats)
+    lon2_rad = np.radians(lons)
+    
+    dlon = lon2_rad - lon1_rad
+    dlat = lat2_rad - lat1_rad
+    
+    a = np.sin(dlat / 2)**2 + math.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2)**2
+    a = np.clip(a, 0.0, 1.0)
+    c = 2 * np.arcsin(np.sqrt(a))
+    
+    r = 6371  # Radius of earth in km
+    return c * r
+
+
 # ═══════════════════════════════════════════════════════════════
 # String Similarity
 # ═══════════════════════════════════════════════════════════════
 
-def calculate_string_similarity(str1: str, str2: str) -> float:
+def calculate_string_similarity(
+    str1: str,
+    str2: str,
+    tokens1: Optional[Set[str]] = None,
+    tokens2: Optional[Set[str]] = None
+) -> float:
     """
     Multi-strategy string similarity combining:
     1. Exact normalized match
@@ -183,6 +191,8 @@ def calculate_string_similarity(str1: str, str2: str) -> float:
     3. Token overlap with synonym awareness
     4. Substring containment bonus
     
+    Pre-computed `tokenize` output can be passed in to skip re-tokenizing.
+    
     Returns: Similarity score between 0 and 1
     """
     if not str1 or not str2:
@@ -199,8 +209,10 @@ def calculate_string_similarity(str1: str, str2: str) -> float:
     lev_score = Levenshtein.ratio(s1, s2)
     
     # 2. Token overlap (good for word reordering, synonym matching)
-    tokens1 = tokenize(s1)
-    tokens2 = tokenize(s2)
+    if tokens1 is None:
+        tokens1 = tokenize(s1)
+    if tokens2 is None:
+        tokens2 = tokenize(s2)
     token_score = calculate_token_overlap(tokens1, tokens2)
     
     # 3. Substring containment (one is part of the other)
@@ -224,7 +236,10 @@ def calculate_hybrid_similarity(
     str2: str,
     use_semantic: bool = True,
     semantic_weight: float = 0.7,
-    fuzzy_weight: float = 0.3
+    fuzzy_weight: float = 0.3,
+    tokens1: Optional[Set[str]] = None,
+    tokens2: Optional[Set[str]] = None,
+    semantic_sim: Optional[float] = None
 ) -> float:
     """
     Calculate hybrid similarity combining semantic, fuzzy, and token matching.
@@ -233,16 +248,20 @@ def calculate_hybrid_similarity(
     1. Token-aware fuzzy matching (always)
     2. Semantic embedding similarity (if available)
     3. Weighted combination, never worse than fuzzy alone
+    
+    Callers that already hold tokens or a semantic score (e.g. from cached
+    embeddings) can pass them in to skip recomputing.
     """
     # Enhanced fuzzy + token similarity
-    fuzzy_sim = calculate_string_similarity(str1, str2)
+    fuzzy_sim = calculate_string_similarity(str1, str2, tokens1, tokens2)
     
     if not use_semantic:
         return fuzzy_sim
     
     try:
-        from semantic_search import calculate_semantic_similarity
-        semantic_sim = calculate_semantic_similarity(str1, str2)
+        if semantic_sim is None:
+            from semantic_search import calculate_semantic_similarity
+            semantic_sim = calculate_semantic_similarity(str1, str2)
         
         # Combine with weights
         combined = (semantic_sim * semantic_weight) + (fuzzy_sim * fuzzy_weight)
@@ -283,6 +302,10 @@ def normalize_quantity(qty: float, unit: str) -> float:
     return qty
 
 
+MASS_UNITS = frozenset({'kg', 'g', 'tonne', 'ton', 'mg', 'kilogram', 'gram', 'milligram', 'metric ton'})
+VOLUME_UNITS = frozenset({'l', 'ml', 'litre', 'liter', 'milliliter', 'millilitre'})
+
+
 def are_units_comparable(unit1: str, unit2: str) -> bool:
     """Check if two units can be meaningfully compared."""
     if not unit1 or not unit2:
@@ -294,17 +317,37 @@ def are_units_comparable(unit1: str, unit2: str) -> bool:
     if u1 == u2:
         return True
     
-    mass_units = {'kg', 'g', 'tonne', 'ton', 'mg', 'kilogram', 'gram', 'milligram', 'metric ton'}
-    volume_units = {'l', 'ml', 'litre', 'liter', 'milliliter', 'millilitre'}
-    
-    if u1 in mass_units and u2 in mass_units:
+    if u1 in MASS_UNITS and u2 in MASS_UNITS:
         return True
-    if u1 in volume_units and u2 in volume_units:
+    if u1 in VOLUME_UNITS and u2 in VOLUME_UNITS:
         return True
     
     return False
 
 
+# Unit class codes for columnar scoring: two units are comparable exactly
+# when their codes are equal and non-zero (see are_units_comparable)
+UNIT_NONE = 0
+UNIT_MASS = 1
+UNIT_VOLUME = 2
+_OTHER_UNIT_CODES = {}
+
+
+def unit_class_code(unit: Optional[str]) -> int:
+    """Unit class code: none, mass, volume, or one code per other unit."""
+    if not unit:
+        return UNIT_NONE
+    u = unit.lower().strip().rstrip('s')
+    if u in MASS_UNITS:
+        return UNIT_MASS
+    if u in VOLUME_UNITS:
+        return UNIT_VOLUME
+    code = _OTHER_UNIT_CODES.get(u)
+    if code is None:
+        code = _OTHER_UNIT_CODES.setdefault(u, len(_OTHER_UNIT_CODES) + 3)
+    return code
+
+
 # ═══════════════════════════════════════════════════════════════
 # Match Score Calculation
 # ═══════════════════════════════════════════════════════════════
@@ -422,6 +465,28 @@ def calculate_match_score_detailed(
     Same as calculate_match_score but returns a detailed breakdown 
     for the frontend to display personalized explanations.
     """
+    context = calculate_context_scores(
+        distance_km, supply_price, demand_max_price, max_distance,
+        supply_qty, supply_unit, demand_qty, demand_unit, price_tolerance
+    )
+    return build_match_score_detail(similarity_score, context)
+
+
+def calculate_context_scores(
+    distance_km: float,
+    supply_price: float,
+    demand_max_price: float,
+    max_distance: float,
+    supply_qty: float = None,
+    supply_unit: str = None,
+    demand_qty: float = None,
+    demand_unit: str = None,
+    price_tolerance: float = 0.25
+) -> dict:
+    """
+    Distance, price and quantity parts of the detailed score (60% of the
+    weight), everything that does not depend on the similarity.
+    """
     # 1. Distance Score
     if max_distance <= 0:
         dist_score = 0.0
@@ -430,9 +495,6 @@ def calculate_match_score_detailed(
         dist_score = math.exp(-2.0 * ratio)
         dist_score = max(0.0, min(1.0, dist_score))
     
-    # 2. Similarity Score
-    sim_score = max(0.0, min(1.0, similarity_score))
-    
     # 3. Price Score
     price_score = 0.0
     price_label = "unknown"
@@ -498,27 +560,55 @@ def calculate_match_score_detailed(
         else:
             qty_label = "incompatible_units"
     
-    # Overall
+    return {
+        "distance": dist_score,
+        "price": price_score,
+        "quantity": qty_score,
+        "price_label": price_label,
+        "quantity_label": qty_label,
+        "fulfillment_pct": fulfillment_pct,
+    }
+
+
+def _combine_scores(sim_score: float, price_score: float, dist_score: float, qty_score: float) -> float:
     overall = (
         sim_score  * 0.40 +
         price_score * 0.25 +
         dist_score * 0.20 +
         qty_score  * 0.15
     )
-    overall = min(1.0, max(0.0, overall))
+    return min(1.0, max(0.0, overall))
+
+
+def lean_match_score(similarity_score: float, dist_score: float, price_score: float, qty_score: float) -> float:
+    """
+    The match_score build_match_score_detail would report, without building
+    the breakdown, labels and weights (for ranking before the top K is known).
+    """
+    sim_score = max(0.0, min(1.0, similarity_score))
+    return round(_combine_scores(sim_score, price_score, dist_score, qty_score), 3)
+
+
+def build_match_score_detail(similarity_score: float, context: dict) -> dict:
+    """Final score and breakdown from a similarity and calculate_context_scores."""
+    # 2. Similarity Score
+    sim_score = max(0.0, min(1.0, similarity_score))
+    
+    # Overall
+    overall = _combine_scores(sim_score, context["price"], context["distance"], context["quantity"])
     
     return {
         "match_score": round(overall, 3),
         "breakdown": {
             "similarity": round(sim_score, 3),
-            "distance": round(dist_score, 3),
-            "price": round(price_score, 3),
-            "quantity": round(qty_score, 3),
+            "distance": round(context["distance"], 3),
+            "price": round(context["price"], 3),
+            "quantity": round(context["quantity"], 3),
         },
         "labels": {
-            "price": price_label,
-            "quantity": qty_label,
-            "fulfillment_pct": fulfillment_pct,
+            "price": context["price_label"],
+            "quantity": context["quantity_label"],
+            "fulfillment_pct": context["fulfillment_pct"],
         },
         "weights": {
             "similarity": 0.40,
@@ -529,5 +619,175 @@ def calculate_match_score_detailed(
     }
 
 
+# ═══════════════════════════════════════════════════════════════
+# Columnar Match Scores
+# ═══════════════════════════════════════════════════════════════
+
+# Label codes returned by the columnar functions
+PRICE_LABELS = (
+    "unknown", "budget_unknown", "price_negotiable", "very_affordable",
+    "under_budget", "within_budget", "slightly_over", "over_budget", "expensive",
+)
+QUANTITY_LABELS = (
+    "unknown", "full_fulfillment", "near_full", "partial", "low_partial",
+    "very_low", "incompatible_units",
+)
+
+_DEKKER_SPLIT = 134217729.0  # 2**27 + 1
+
+
+def round3_columnar(x: np.ndarray) -> np.ndarray:
+    """
+    Elementwise round(x, 3) with Python's exact result (finite x >= 0).
+    np.round scales by 1000 first and can round the wrong way near a
+    midpoint; here x * 1000 is split into two exact parts (Dekker) so the
+    distance to the nearest integer is decided without that error.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    k = np.rint(x * 1000.0)
+    c = _DEKKER_SPLIT * x
+    hi = c - (c - x)
+    lo = x - hi
+    # x * 1000 == hi * 1000 + lo * 1000 exactly; both products are exact
+    residual = hi * 1000.0 - k
+    k = np.where((residual - 0.5) + lo * 1000.0 > 0, k + 1.0, k)
+    k = np.where((residual + 0.5) + lo * 1000.0 < 0, k - 1.0, k)
+    return k / 1000.0
+
+
+def calculate_context_scores_columnar(
+    distance_km: np.ndarray,
+    supply_price: np.ndarray,
+    demand_max_price: np.ndarray,
+    max_distance: float,
+    supply_qty: np.ndarray,
+    supply_unit_class: np.ndarray,
+    demand_qty: np.ndarray,
+    demand_unit_class: np.ndarray,
+    price_tolerance: float = 0.25
+) -> dict:
+    """
+    calculate_context_scores over whole candidate columns. Missing prices
+    and quantities are NaN; quantities are already normalize_quantity'd and
+    units are unit_class_code's. Labels come back as codes into
+    PRICE_LABELS / QUANTITY_LABELS, a missing fulfillment_pct as NaN.
+    """
+    distance_km = np.asarray(distance_km, dtype=np.float64)
+    n = len(distance_km)
+    sp, dp, sq, dq = (
+        np.broadcast_to(np.asarray(a, dtype=np.float64), (n,))
+        for a in (supply_price, demand_max_price, supply_qty, demand_qty)
+    )
+    su, du = (
+        np.broadcast_to(np.asarray(a, dtype=np.int64), (n,))
+        for a in (supply_unit_class, demand_unit_class)
+    )
+
+    # 1. Distance Score (math.exp per element: np.exp may differ in the last bit)
+    if max_distance <= 0:
+        dist_score = np.zeros(n)
+    else:
+        exponent = -2.0 * (distance_km / max_distance)
+        dist_score = np.fromiter(map(math.exp, exponent.tolist()), dtype=np.float64, count=n)
+        dist_score = np.clip(dist_score, 0.0, 1.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 3. Price Score
+        budget_unknown = np.isnan(dp) | (dp <= 0)
+        negotiable = ~budget_unknown & (np.isnan(sp) | (sp <= 0))
+        priced = ~budget_unknown & ~negotiable
+        under = priced & (sp <= dp)
+        over = priced & ~(sp <= dp)
+
+        savings_ratio = 1.0 - (sp / dp)
+        overage_ratio = (sp - dp) / dp
+        slightly = over & (overage_ratio <= price_tolerance)
+        over_budget = over & ~slightly & (overage_ratio <= price_tolerance * 2)
+        expensive = over & ~slightly & ~over_budget
+
+        price_score = np.select(
+            [budget_unknown, negotiable, under & (savings_ratio > 0.5), under,
+             slightly, over_budget, expensive],
+            [0.8, 0.7, 0.95, 1.0,
+             1.0 - (0.4 * (overage_ratio / price_tolerance)),
+             0.6 - (0.3 * ((overage_ratio - price_tolerance) / price_tolerance)),
+             0.15],
+            default=0.0,
+        )
+        price_label = np.select(
+            [budget_unknown, negotiable, under & (savings_ratio > 0.5),
+             under & (savings_ratio > 0.2), under, slightly, over_budget, expensive],
+            [1, 2, 3, 4, 5, 6, 7, 8],
+            default=0,
+        ).astype(np.int8)
+
+        # 4. Quantity Score
+        present = ~np.isnan(sq) & ~np.isnan(dq) & (dq > 0)
+        comparable = (su != UNIT_NONE) & (su == du)
+        fulfillment = sq / dq
+        computed = present & comparable
+
+    fulfilled = [
+        computed & (fulfillment >= 1.0),
+        computed & (fulfillment >= 0.8),
+        computed & (fulfillment >= 0.5),
+        computed & (fulfillment >= 0.25),
+        computed,
+    ]
+    qty_score = np.select(fulfilled, [1.0, 0.9, 0.75, 0.5, 0.3], default=0.5)
+    qty_label = np.select(
+        fulfilled + [present & ~comparable], [1, 2, 3, 4, 5, 6], default=0
+    ).astype(np.int8)
+    fulfillment_pct = np.where(
+        computed, np.rint(np.minimum(fulfillment * 100, 100)), np.nan
+    )
+
+    return {
+        "distance": dist_score,
+        "price": price_score,
+        "quantity": qty_score,
+        "price_label": price_label,
+        "quantity_label": qty_label,
+        "fulfillment_pct": fulfillment_pct,
+    }
+
+
+def _combine_scores_columnar(sim_score: np.ndarray, context: dict) -> np.ndarray:
+    overall = (
+        sim_score  * 0.40 +
+        context["price"] * 0.25 +
+        context["distance"] * 0.20 +
+        context["quantity"]  * 0.15
+    )
+    return np.minimum(1.0, np.maximum(0.0, overall))
+
+
+def match_score_upper_bound_columnar(context: dict, similarity: float = 1.0) -> np.ndarray:
+    """
+    Highest rounded match_score each row can reach with a similarity of at
+    most `similarity` (the weighted sum is monotonic in similarity).
+    """
+    return round3_columnar(_combine_scores_columnar(similarity, context))
+
+
+def calculate_match_scores_columnar(similarity: np.ndarray, context: dict) -> dict:
+    """
+    Columnar build_match_score_detail: rounded match_score and breakdown
+    arrays for similarities against calculate_context_scores_columnar.
+    """
+    sim_score = np.clip(np.asarray(similarity, dtype=np.float64), 0.0, 1.0)
+    overall = _combine_scores_columnar(sim_score, context)
+    return {
+        "match_score": round3_columnar(overall),
+        "similarity": round3_columnar(sim_score),
+        "distance": round3_columnar(context["distance"]),
+        "price": round3_columnar(context["price"]),
+        "quantity": round3_columnar(context["quantity"]),
+        "price_label": context["price_label"],
+        "quantity_label": context["quantity_label"],
+        "fulfillment_pct": context["fulfillment_pct"],
+    }
+
+
 def generate_cache_key(demand_id: int) -> str:
     return f"search_results:demand:{demand_id}"